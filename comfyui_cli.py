@@ -5,6 +5,8 @@ Command-line interface for managing ComfyUI workflows
 """
 
 import argparse
+import os
+import re
 import sys
 from pathlib import Path
 import logging
@@ -14,16 +16,60 @@ import time
 # Add src to path
 sys.path.insert(0, str(Path(__file__).parent / 'src'))
 
-from client import ComfyUIClient
-from workflow_manager import WorkflowManager
-from queue_manager import QueueManager, JobStatus
-from utils import load_config, setup_logging, format_duration, extract_output_images
+# Project modules (and their websocket/requests/yaml dependencies) are
+# imported inside each command so --help and light commands start fast
 
 logger = logging.getLogger(__name__)
 
+# --update spec: node_id.input_name=value
+_UPDATE_RE = re.compile(r'^(?P<node>[^.=]+)\.(?P<input>[^.=]+)=(?P<value>.*)$', re.DOTALL)
+
+
+def _load_workflow_safe(workflow_mgr, wf_path):
+    """Load a workflow, returning the exception instead of raising it"""
+    try:
+        return wf_path, workflow_mgr.load_workflow(wf_path)
+    except Exception as e:
+        return wf_path, e
+
+
+def _download_images(client, images, output_dir, max_workers=8):
+    """Download output images concurrently, reporting each as it finishes"""
+    from concurrent.futures import ThreadPoolExecutor, as_completed
+
+    def download(img):
+        return client.download_image_to(
+            output_dir / img['filename'],
+            img['filename'],
+            subfolder=img['subfolder'],
+            folder_type=img['type']
+        )
+
+    # Images from different subfolders/types can share a filename and so a
+    # target path; download each target once (the last image wins, as when
+    # they were written one after another) so no two threads write one file
+    by_target = {img['filename']: img for img in images}
+
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        futures = {executor.submit(download, img): img for img in by_target.values()}
+
+        for future in as_completed(futures):
+            filename = futures[future]['filename']
+            print(f"  - {filename}")
+
+            try:
+                print(f"    Saved to: {future.result()}")
+            except Exception as e:
+                logger.error(f"Failed to download {filename}: {e}")
+
 
 def cmd_send(args):
     """Send a workflow to ComfyUI"""
+    from client import ComfyUIClient
+    from workflow_manager import WorkflowManager
+    from utils import (load_config, setup_logging, format_duration,
+                       extract_output_images, json_loads, json_dumps)
+
     # Load config
     config = load_config(Path(args.config))
     setup_logging(config)
@@ -54,21 +100,15 @@ def cmd_send(args):
     # Apply modifications if specified
     if args.update:
         for update in args.update:
-            parts = update.split('=', 1)
-            if len(parts) != 2:
+            match = _UPDATE_RE.match(update)
+            if not match:
                 logger.error(f"Invalid update format: {update}")
                 continue
 
-            path, value = parts
-            path_parts = path.split('.')
-            if len(path_parts) != 2:
-                logger.error(f"Invalid path format: {path}")
-                continue
-
-            node_id, input_name = path_parts
+            node_id, input_name, value = match.group('node', 'input', 'value')
             # Try to parse value as JSON
             try:
-                value = json.loads(value)
+                value = json_loads(value)
             except json.JSONDecodeError:
                 pass  # Keep as string
 
@@ -79,7 +119,7 @@ def cmd_send(args):
         try:
             client.connect_websocket()
 
-            # Setup progress callback
+            # Setup progress callback (the client coalesces progress frames)
             def on_progress(data):
                 if 'data' in data:
                     value = data['data'].get('value', 0)
@@ -92,7 +132,7 @@ def cmd_send(args):
 
     # Send workflow
     print(f"Sending workflow: {workflow_path.name}")
-    start_time = time.time()
+    start_time = time.perf_counter_ns()
 
     try:
         response = client.queue_prompt(workflow)
@@ -109,7 +149,7 @@ def cmd_send(args):
             print("Waiting for completion...")
             history = client.wait_for_completion(prompt_id, timeout=args.timeout)
 
-            duration = time.time() - start_time
+            duration = (time.perf_counter_ns() - start_time) / 1e9
             print(f"\nCompleted in {format_duration(duration)}")
 
             # Extract and download images
@@ -122,31 +162,13 @@ def cmd_send(args):
                     output_dir = Path(output_config.get('output_dir', './outputs'))
                     output_dir.mkdir(parents=True, exist_ok=True)
 
-                    for img in images:
-                        filename = img['filename']
-                        print(f"  - {filename}")
-
-                        # Download image
-                        try:
-                            image_data = client.get_image(
-                                filename,
-                                subfolder=img['subfolder'],
-                                folder_type=img['type']
-                            )
-
-                            output_path = output_dir / filename
-                            with open(output_path, 'wb') as f:
-                                f.write(image_data)
-
-                            print(f"    Saved to: {output_path}")
-                        except Exception as e:
-                            logger.error(f"Failed to download {filename}: {e}")
+                    # Download images
+                    _download_images(client, images, output_dir)
 
                     # Save metadata if enabled
                     if output_config.get('save_metadata', True):
                         metadata_path = output_dir / f"{prompt_id}_metadata.json"
-                        with open(metadata_path, 'w') as f:
-                            json.dump(history, f, indent=2)
+                        metadata_path.write_bytes(json_dumps(history, indent=True))
                         print(f"\nMetadata saved to: {metadata_path}")
 
         return 0
@@ -160,6 +182,12 @@ def cmd_send(args):
 
 def cmd_batch(args):
     """Process multiple workflows in batch"""
+    from concurrent.futures import ThreadPoolExecutor
+    from client import ComfyUIClient
+    from workflow_manager import WorkflowManager
+    from queue_manager import QueueManager, MetadataWriter
+    from utils import load_config, setup_logging
+
     # Load config
     config = load_config(Path(args.config))
     setup_logging(config)
@@ -173,13 +201,24 @@ def cmd_batch(args):
         timeout=comfyui_config['timeout']
     )
 
+    # Write job metadata in the background if enabled, as one JSON Lines
+    # file per batch rather than one file per job
+    output_config = config.get('output', {})
+    metadata_writer = None
+    if output_config.get('save_metadata', True):
+        metadata_writer = MetadataWriter(
+            Path(output_config.get('output_dir', './outputs')),
+            jsonl_name=f"batch_{time.strftime('%Y%m%d_%H%M%S')}.jsonl"
+        )
+
     # Initialize queue manager
     batch_config = config.get('batch', {})
     queue_mgr = QueueManager(
         client,
         max_concurrent=batch_config.get('max_concurrent', 3),
         retry_on_failure=batch_config.get('retry_on_failure', True),
-        max_retries=batch_config.get('max_retries', 3)
+        max_retries=batch_config.get('max_retries', 3),
+        metadata_writer=metadata_writer
     )
 
     # Setup callbacks
@@ -200,22 +239,44 @@ def cmd_batch(args):
         logger.error(f"Directory not found: {workflows_dir}")
         return 1
 
-    workflow_files = list(workflows_dir.glob('*.json'))
+    # Symlinks may point at the same workflow; queue each real file once
+    seen = set()
+    workflow_files = []
+    with os.scandir(workflows_dir) as entries:
+        for entry in entries:
+            if not (entry.name.endswith('.json') and entry.is_file()):
+                continue
+
+            real_path = os.path.realpath(entry.path)
+            if real_path not in seen:
+                seen.add(real_path)
+                workflow_files.append(Path(entry.path))
+
     if not workflow_files:
         logger.error(f"No workflow files found in {workflows_dir}")
         return 1
 
     print(f"Found {len(workflow_files)} workflow(s)")
 
+    # Load workflows in parallel so disk reads and JSON parsing overlap
+    with ThreadPoolExecutor(max_workers=os.cpu_count()) as executor:
+        loaded = list(executor.map(
+            lambda wf_path: _load_workflow_safe(workflow_mgr, wf_path),
+            workflow_files
+        ))
+
     # Add jobs
-    for wf_path in workflow_files:
+    for wf_path, workflow in loaded:
+        if isinstance(workflow, Exception):
+            logger.error(f"Failed to load {wf_path}: {workflow}")
+            continue
+
         try:
-            workflow = workflow_mgr.load_workflow(wf_path)
             job_id = wf_path.stem
             queue_mgr.add_job(job_id, workflow, metadata={'source': str(wf_path)})
             print(f"  Added: {wf_path.name}")
         except Exception as e:
-            logger.error(f"Failed to load {wf_path}: {e}")
+            logger.error(f"Failed to add {wf_path}: {e}")
 
     # Start processing
     print(f"\nProcessing with {batch_config.get('max_concurrent', 3)} concurrent jobs...")
@@ -243,11 +304,16 @@ def cmd_batch(args):
     print("=" * 50)
 
     queue_mgr.stop()
+
+    if metadata_writer:
+        print(f"Metadata saved to: {metadata_writer.jsonl_path}")
     return 0 if stats['failed'] == 0 else 1
 
 
 def cmd_validate(args):
     """Validate a workflow"""
+    from workflow_manager import WorkflowManager
+
     workflow_mgr = WorkflowManager()
     workflow_path = Path(args.workflow)
 
@@ -281,6 +347,9 @@ def cmd_validate(args):
 
 def cmd_queue_status(args):
     """Get queue status"""
+    from client import ComfyUIClient
+    from utils import load_config
+
     # Load config
     config = load_config(Path(args.config))
 
@@ -56,7 +56,7 @@ def example_websocket_progress():
     # Connect WebSocket
     client.connect_websocket()
 
-    # Setup progress callback
+    # Setup progress callback (frames are coalesced to ~20 per second)
     def on_progress(data):
         if 'data' in data:
             value = data['data'].get('value', 0)
@@ -156,10 +156,10 @@ def example_batch_processing():
     # Load base workflow
     base_workflow = workflow_mgr.load_workflow(Path("workflows/example_workflow.json"))
 
-    # Add multiple jobs with variations
+    # Add multiple jobs with variations (only the changed node is copied,
+    # the rest is shared with base_workflow)
     for i in range(5):
-        workflow = base_workflow.copy()
-        workflow_mgr.update_node_input(workflow, "3", "seed", 12345 + i)
+        workflow = workflow_mgr.with_override(base_workflow, "3", "seed", 12345 + i)
 
         queue_mgr.add_job(f"job_{i}", workflow)
 
@@ -11,7 +11,7 @@ sys.path.insert(0, str(Path(__file__).parent.parent / 'src'))
 
 from client import ComfyUIClient
 from workflow_manager import WorkflowManager
-from utils import extract_output_images
+from utils import iter_output_images
 
 
 def main():
@@ -41,31 +41,27 @@ def main():
     print("Waiting for completion...")
     history = client.wait_for_completion(prompt_id, timeout=300)
 
-    # Get output images
-    images = extract_output_images(history)
-    print(f"\nGenerated {len(images)} image(s):")
-
-    # Download images
+    # Download output images as they are found in the history
     output_dir = Path("outputs")
     output_dir.mkdir(exist_ok=True)
 
-    for img in images:
+    print("\nGenerated images:")
+    count = 0
+    for img in iter_output_images(history):
+        count += 1
         filename = img['filename']
         print(f"  Downloading: {filename}")
 
-        image_data = client.get_image(
+        output_path = client.download_image_to(
+            output_dir / filename,
             filename,
             subfolder=img['subfolder'],
             folder_type=img['type']
         )
 
-        output_path = output_dir / filename
-        with open(output_path, 'wb') as f:
-            f.write(image_data)
-
         print(f"    Saved to: {output_path}")
 
-    print("\nDone!")
+    print(f"\nDone! Downloaded {count} image(s)")
     return 0
 
 
@@ -2,20 +2,91 @@
 ComfyUI API Client with WebSocket support
 """
 
+import io
+import itertools
 import json
+import mimetypes
 import uuid
-import urllib.request
 import urllib.parse
-import urllib.error
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
 import websocket
 import threading
 import time
-from typing import Dict, Any, Optional, Callable, List
+from typing import BinaryIO, Dict, Any, Iterator, Optional, Callable, Tuple, Union
 from pathlib import Path
 import logging
 
+try:
+    import orjson
+except ImportError:  # orjson is optional, fall back to stdlib json
+    orjson = None
+
 logger = logging.getLogger(__name__)
 
+# JSON codec for HTTP bodies and WebSocket frames (which arrive at high
+# rates during sampling); orjson is used when installed
+_json_loads = orjson.loads if orjson is not None else json.loads
+
+
+def _json_dumps(obj: Any) -> bytes:
+    """Serialize an object to UTF-8 JSON bytes"""
+    if orjson is not None:
+        return orjson.dumps(obj)
+    return json.dumps(obj).encode('utf-8')
+
+# Multipart boundaries only need to be absent from the body, so one random
+# token per process plus a per-client counter is enough
+_BOUNDARY_PREFIX = f"----ComfyUIClient{uuid.uuid4().hex}"
+
+
+class _MultipartFileBody:
+    """
+    multipart/form-data request body that streams a file object
+
+    Provides read() and __len__ so requests sends it with a Content-Length
+    header while the file contents are pulled in chunks as the socket is
+    written, instead of being buffered in memory.
+    """
+
+    def __init__(self, boundary: str, fields: Dict[str, str], file_field: str,
+                 filename: str, file: BinaryIO, size: int, mime_type: str):
+        head = b''.join(
+            f'--{boundary}\r\n'
+            f'Content-Disposition: form-data; name="{key}"\r\n\r\n'
+            f'{value}\r\n'.encode()
+            for key, value in fields.items()
+        )
+        head += (
+            f'--{boundary}\r\n'
+            f'Content-Disposition: form-data; name="{file_field}"; filename="{filename}"\r\n'
+            f'Content-Type: {mime_type}\r\n\r\n'
+        ).encode()
+        tail = f'\r\n--{boundary}--\r\n'.encode()
+
+        self.content_type = f'multipart/form-data; boundary={boundary}'
+        self._length = len(head) + size + len(tail)
+        self._parts = [io.BytesIO(head), file, io.BytesIO(tail)]
+
+    def __len__(self) -> int:
+        return self._length
+
+    def read(self, size: int = -1) -> bytes:
+        """Read up to size bytes of the encoded body (all if size < 0)"""
+        chunks = []
+        while self._parts and (size is None or size < 0 or size > 0):
+            data = self._parts[0].read(size)
+            if not data:
+                self._parts.pop(0)
+                continue
+
+            chunks.append(data)
+            if size is not None and size > 0:
+                size -= len(data)
+
+        return b''.join(chunks)
+
 
 class ComfyUIClient:
     """Advanced ComfyUI API Client with WebSocket support for real-time updates"""
@@ -38,65 +109,106 @@ class ComfyUIClient:
         self.base_url = f"{protocol}://{host}:{port}"
         self.ws_url = f"ws://{host}:{port}/ws"
         self.client_id = str(uuid.uuid4())
+        self._ws_connect_url = f"{self.ws_url}?clientId={self.client_id}"
+        self._client_id_json = _json_dumps(self.client_id)
+
+        # Keep-alive connection pool shared by all HTTP calls to the server.
+        # Only idempotent requests are retried, so prompts are never re-posted.
+        self._session = requests.Session()
+        adapter = HTTPAdapter(
+            pool_connections=16,
+            pool_maxsize=32,
+            max_retries=Retry(total=3, backoff_factor=0.2,
+                              status_forcelist=[502, 503, 504])
+        )
+        self._session.mount('http://', adapter)
+        self._session.mount('https://', adapter)
 
         self.ws = None
         self.ws_thread = None
         self.ws_running = False
-        self.ws_callbacks: Dict[str, List[Callable]] = {
-            'progress': [],
-            'executing': [],
-            'executed': [],
-            'execution_start': [],
-            'execution_cached': [],
-            'execution_error': [],
+        self._ws_open_event = threading.Event()
+        self._ws_stop_event = threading.Event()
+        # Callbacks are stored as tuples (rebuilt by on()) so dispatching a
+        # frame is one dict lookup plus tuple iteration
+        self.ws_callbacks: Dict[str, Tuple[Callable, ...]] = {
+            'progress': (),
+            'executing': (),
+            'executed': (),
+            'execution_start': (),
+            'execution_cached': (),
+            'execution_error': (),
         }
 
+        # High-rate event types delivered at most once per window (in ms),
+        # with only the latest frame passed to callbacks. Only touched from
+        # the WebSocket thread, so callbacks keep a single thread and order
+        self._coalesce_ms: Dict[str, int] = {'progress': 50}
+        self._latest: Dict[str, Any] = {}
+        self._coalesce_deadlines: Dict[str, float] = {}
+
+        # Prompts waited on via WebSocket, signalled when execution finishes
+        self._pending: Dict[str, threading.Event] = {}
+        self._pending_lock = threading.Lock()
+
+        self._upload_counter = itertools.count()
+
         logger.info(f"Initialized ComfyUI Client: {self.base_url} (Client ID: {self.client_id})")
 
     def _make_request(self, endpoint: str, method: str = "GET",
-                      data: Optional[Dict] = None) -> Any:
-        """Make HTTP request to ComfyUI API"""
+                      data: Optional[Dict] = None,
+                      body: Optional[bytes] = None) -> Any:
+        """Make HTTP request to ComfyUI API (body: pre-serialized JSON for POST)"""
         url = f"{self.base_url}/{endpoint}"
 
         try:
             if method == "GET":
-                req = urllib.request.Request(url)
+                response = self._session.get(url, timeout=self.timeout)
             elif method == "POST":
-                json_data = json.dumps(data).encode('utf-8')
-                req = urllib.request.Request(
+                json_data = body if body is not None else _json_dumps(data)
+                response = self._session.post(
                     url,
                     data=json_data,
-                    headers={'Content-Type': 'application/json'}
+                    headers={'Content-Type': 'application/json'},
+                    timeout=self.timeout
                 )
             else:
                 raise ValueError(f"Unsupported method: {method}")
 
-            with urllib.request.urlopen(req, timeout=self.timeout) as response:
-                return json.loads(response.read().decode('utf-8'))
-        except urllib.error.URLError as e:
+            response.raise_for_status()
+            return _json_loads(response.content)
+        except requests.RequestException as e:
             logger.error(f"Request failed: {e}")
             raise ConnectionError(f"Failed to connect to ComfyUI: {e}")
         except Exception as e:
             logger.error(f"Unexpected error: {e}")
             raise
 
-    def queue_prompt(self, workflow: Dict[str, Any]) -> Dict[str, Any]:
+    def queue_prompt(self, workflow: Union[Dict[str, Any], bytes]) -> Dict[str, Any]:
         """
         Queue a workflow prompt
 
         Args:
-            workflow: ComfyUI workflow dictionary
+            workflow: ComfyUI workflow dictionary, or the workflow already
+                      serialized to JSON bytes (sent without re-encoding)
 
         Returns:
             Response containing prompt_id and other info
         """
-        payload = {
-            "prompt": workflow,
-            "client_id": self.client_id
-        }
-
         logger.info(f"Queueing prompt with client_id: {self.client_id}")
-        response = self._make_request("prompt", method="POST", data=payload)
+
+        if isinstance(workflow, bytes):
+            body = b''.join([
+                b'{"prompt": ', workflow,
+                b', "client_id": ', self._client_id_json, b'}'
+            ])
+            response = self._make_request("prompt", method="POST", body=body)
+        else:
+            payload = {
+                "prompt": workflow,
+                "client_id": self.client_id
+            }
+            response = self._make_request("prompt", method="POST", data=payload)
 
         if 'prompt_id' in response:
             logger.info(f"Prompt queued successfully: {response['prompt_id']}")
@@ -145,43 +257,54 @@ class ComfyUIClient:
         Returns:
             Upload response with filename
         """
-        import mimetypes
-        from io import BytesIO
-
-        if not image_path.exists():
-            raise FileNotFoundError(f"Image not found: {image_path}")
-
-        # Prepare multipart form data
-        boundary = f"----WebKitFormBoundary{uuid.uuid4().hex}"
-        body = BytesIO()
+        try:
+            f = open(image_path, 'rb')
+        except FileNotFoundError:
+            raise FileNotFoundError(f"Image not found: {image_path}") from None
 
-        # Add form fields
-        for key, value in [("subfolder", subfolder), ("overwrite", str(overwrite).lower())]:
-            body.write(f'--{boundary}\r\n'.encode())
-            body.write(f'Content-Disposition: form-data; name="{key}"\r\n\r\n'.encode())
-            body.write(f'{value}\r\n'.encode())
+        with f:
+            return self.upload_image_stream(f, image_path.name, subfolder, overwrite)
 
-        # Add file
-        body.write(f'--{boundary}\r\n'.encode())
-        body.write(f'Content-Disposition: form-data; name="image"; filename="{image_path.name}"\r\n'.encode())
-        mime_type = mimetypes.guess_type(str(image_path))[0] or 'application/octet-stream'
-        body.write(f'Content-Type: {mime_type}\r\n\r\n'.encode())
+    def upload_image_stream(self, stream: BinaryIO, filename: str,
+                            subfolder: str = "",
+                            overwrite: bool = False) -> Dict[str, Any]:
+        """
+        Upload an image to ComfyUI from an open binary stream
 
-        with open(image_path, 'rb') as f:
-            body.write(f.read())
+        The stream is sent from its current position to the end without
+        being buffered in memory or written to disk first.
 
-        body.write(f'\r\n--{boundary}--\r\n'.encode())
+        Args:
+            stream: Seekable binary file object with the image data
+            filename: Name to upload the image as
+            subfolder: Optional subfolder in ComfyUI input directory
+            overwrite: Whether to overwrite existing file
 
-        # Make request
+        Returns:
+            Upload response with filename
+        """
         url = f"{self.base_url}/upload/image"
-        req = urllib.request.Request(url, data=body.getvalue())
-        req.add_header('Content-Type', f'multipart/form-data; boundary={boundary}')
+        mime_type = mimetypes.guess_type(filename)[0] or 'application/octet-stream'
+        form = {"subfolder": subfolder, "overwrite": str(overwrite).lower()}
 
         try:
-            with urllib.request.urlopen(req, timeout=self.timeout) as response:
-                result = json.loads(response.read().decode('utf-8'))
-                logger.info(f"Uploaded image: {image_path.name}")
-                return result
+            start = stream.tell()
+            size = stream.seek(0, io.SEEK_END) - start
+            stream.seek(start)
+
+            body = _MultipartFileBody(f"{_BOUNDARY_PREFIX}{next(self._upload_counter)}", form,
+                                      'image', filename, stream, size, mime_type)
+            response = self._session.post(
+                url,
+                data=body,
+                headers={'Content-Type': body.content_type},
+                timeout=self.timeout
+            )
+
+            response.raise_for_status()
+            result = _json_loads(response.content)
+            logger.info(f"Uploaded image: {filename}")
+            return result
         except Exception as e:
             logger.error(f"Failed to upload image: {e}")
             raise
@@ -199,21 +322,96 @@ class ComfyUIClient:
         Returns:
             Image bytes
         """
-        params = urllib.parse.urlencode({
-            "filename": filename,
-            "subfolder": subfolder,
-            "type": folder_type
-        })
+        url = self._image_url(filename, subfolder, folder_type)
+
+        try:
+            response = self._session.get(url, timeout=self.timeout)
+            response.raise_for_status()
+            return response.content
+        except Exception as e:
+            logger.error(f"Failed to download image {filename}: {e}")
+            raise
+
+    def iter_image(self, filename: str, subfolder: str = "",
+                   folder_type: str = "output",
+                   chunk_size: int = 64 * 1024) -> Iterator[bytes]:
+        """
+        Stream an image from ComfyUI in chunks
+
+        The request is made (and its status checked) before this returns;
+        the body is read as the iterator is consumed. Exhaust or close the
+        iterator to release the connection.
+
+        Args:
+            filename: Image filename
+            subfolder: Subfolder path
+            folder_type: Type of folder (output, input, temp)
+            chunk_size: Read size in bytes
+
+        Returns:
+            Iterator over the image bytes
+        """
+        url = self._image_url(filename, subfolder, folder_type)
+
+        response = None
+        try:
+            response = self._session.get(url, stream=True, timeout=self.timeout)
+            response.raise_for_status()
+        except Exception as e:
+            if response is not None:
+                response.close()
+            logger.error(f"Failed to download image {filename}: {e}")
+            raise
+
+        return self._iter_response(response, chunk_size)
+
+    @staticmethod
+    def _iter_response(response: requests.Response, chunk_size: int) -> Iterator[bytes]:
+        """Yield a streamed response body, closing the response afterwards"""
+        with response:
+            yield from response.iter_content(chunk_size)
+
+    def download_image_to(self, output_path: Path, filename: str,
+                          subfolder: str = "", folder_type: str = "output",
+                          chunk_size: int = 64 * 1024) -> Path:
+        """
+        Download an image from ComfyUI straight to disk
 
-        url = f"{self.base_url}/view?{params}"
+        The response is streamed in chunks, so the whole image is never held
+        in memory.
+
+        Args:
+            output_path: Destination file path
+            filename: Image filename
+            subfolder: Subfolder path
+            folder_type: Type of folder (output, input, temp)
+            chunk_size: Read size in bytes
+
+        Returns:
+            Path the image was written to
+        """
+        url = self._image_url(filename, subfolder, folder_type)
 
         try:
-            with urllib.request.urlopen(url, timeout=self.timeout) as response:
-                return response.read()
+            with self._session.get(url, stream=True, timeout=self.timeout) as response:
+                response.raise_for_status()
+                with open(output_path, 'wb') as f:
+                    for chunk in response.iter_content(chunk_size):
+                        f.write(chunk)
+            return output_path
         except Exception as e:
             logger.error(f"Failed to download image {filename}: {e}")
             raise
 
+    def _image_url(self, filename: str, subfolder: str, folder_type: str) -> str:
+        """Build the /view URL for an image"""
+        params = urllib.parse.urlencode({
+            "filename": filename,
+            "subfolder": subfolder,
+            "type": folder_type
+        })
+        return f"{self.base_url}/view?{params}"
+
     # WebSocket Methods
 
     def connect_websocket(self, auto_reconnect: bool = True):
@@ -227,61 +425,130 @@ class ComfyUIClient:
             logger.warning("WebSocket already connected")
             return
 
-        def on_message(ws, message):
+        # Retire a previous session's loop (e.g. one sleeping in reconnect
+        # backoff) so two threads never share self.ws and the open state
+        if self.ws_thread is not None and self.ws_thread.is_alive():
+            self._ws_stop_event.set()
+            if self.ws:
+                self.ws.close()
+            self.ws_thread.join(timeout=5)
+
+        def on_data(ws, message, opcode, fin):
+            # Binary frames carry preview images, not JSON events. Text frames
+            # also arrive as bytes since UTF-8 validation is skipped, so the
+            # opcode is the only reliable way to tell them apart.
+            if opcode != websocket.ABNF.OPCODE_TEXT:
+                return
+
             try:
-                data = json.loads(message)
-                msg_type = data.get('type')
+                data = _json_loads(message)
+            except ValueError as e:
+                logger.error(f"Error processing WebSocket message: {e}")
+                return
 
-                if msg_type in self.ws_callbacks:
-                    for callback in self.ws_callbacks[msg_type]:
-                        callback(data)
+            msg_type = data.get('type')
 
-            except Exception as e:
-                logger.error(f"Error processing WebSocket message: {e}")
+            # ComfyUI sends executing with node=None once a prompt is done
+            if msg_type == 'executing' or msg_type == 'execution_error':
+                payload = data.get('data') or {}
+                if msg_type == 'execution_error' or payload.get('node') is None:
+                    self._signal_prompt_done(payload.get('prompt_id'))
+
+            callbacks = self.ws_callbacks.get(msg_type)
+            if msg_type in self._coalesce_ms:
+                if callbacks:
+                    self._coalesce(msg_type, data)
+                return
+
+            # Deliver any held-back progress first so callbacks see events in order
+            if self._latest:
+                self._flush_coalesced()
+
+            if callbacks:
+                self._dispatch(msg_type, callbacks, data)
 
         def on_error(ws, error):
             logger.error(f"WebSocket error: {error}")
 
         def on_close(ws, close_status_code, close_msg):
             logger.info("WebSocket connection closed")
+            self._flush_coalesced()
+            if stop_event.is_set():
+                return  # disconnected, or retired by a newer session
             self.ws_running = False
-
-            if auto_reconnect:
-                logger.info("Attempting to reconnect...")
-                time.sleep(2)
-                self.connect_websocket(auto_reconnect)
+            self._ws_open_event.clear()
+            self._wake_pending()
 
         def on_open(ws):
+            nonlocal backoff
+            if stop_event.is_set():
+                # Late connection of a session that has since been retired
+                ws.close()
+                return
             logger.info("WebSocket connection established")
+            backoff = 1.0
             self.ws_running = True
-
-        ws_url = f"{self.ws_url}?clientId={self.client_id}"
-        self.ws = websocket.WebSocketApp(
-            ws_url,
-            on_message=on_message,
-            on_error=on_error,
-            on_close=on_close,
-            on_open=on_open
-        )
-
-        self.ws_thread = threading.Thread(target=self.ws.run_forever)
+            self._ws_open_event.set()
+
+        # One event per connection, so a previous session's reconnect loop
+        # can never be revived by a later connect_websocket call
+        stop_event = threading.Event()
+        backoff = 1.0
+
+        def run():
+            # Reconnect in this thread with exponential backoff, replacing
+            # the WebSocketApp each attempt so old ones can be collected
+            nonlocal backoff
+            while not stop_event.is_set():
+                self.ws = websocket.WebSocketApp(
+                    self._ws_connect_url,
+                    on_data=on_data,
+                    on_error=on_error,
+                    on_close=on_close,
+                    on_open=on_open
+                )
+                # ComfyUI frames are JSON or binary previews; skipping
+                # websocket-client's pure-Python UTF-8 validation keeps up
+                # with high-rate progress frames
+                self.ws.run_forever(skip_utf8_validation=True)
+
+                # Once stopped, the state belongs to disconnect_websocket or
+                # to a newer session
+                if stop_event.is_set():
+                    break
+
+                self.ws_running = False
+                self._ws_open_event.clear()
+
+                if not auto_reconnect:
+                    break
+
+                logger.info(f"Attempting to reconnect in {backoff:.0f}s...")
+                if stop_event.wait(backoff):
+                    break
+                backoff = min(backoff * 2, 60.0)
+
+        self._ws_stop_event = stop_event
+        self._ws_open_event.clear()
+        self.ws_thread = threading.Thread(target=run, name="ComfyUI-WebSocket")
         self.ws_thread.daemon = True
         self.ws_thread.start()
 
         # Wait for connection
-        timeout = 5
-        start = time.time()
-        while not self.ws_running and time.time() - start < timeout:
-            time.sleep(0.1)
-
-        if not self.ws_running:
+        if not self._ws_open_event.wait(timeout=5):
+            stop_event.set()
+            if self.ws:
+                self.ws.close()
             raise ConnectionError("Failed to establish WebSocket connection")
 
     def disconnect_websocket(self):
         """Disconnect from WebSocket"""
+        self._ws_stop_event.set()
         if self.ws:
             self.ws.close()
             self.ws_running = False
+            self._ws_open_event.clear()
+            self._wake_pending()
             logger.info("WebSocket disconnected")
 
     def on(self, event_type: str, callback: Callable):
@@ -293,7 +560,7 @@ class ComfyUIClient:
             callback: Callback function to handle event
         """
         if event_type in self.ws_callbacks:
-            self.ws_callbacks[event_type].append(callback)
+            self.ws_callbacks[event_type] += (callback,)
         else:
             logger.warning(f"Unknown event type: {event_type}")
 
@@ -310,17 +577,103 @@ class ComfyUIClient:
         """
         start_time = time.time()
 
+        if self.ws_running:
+            # Block until the WebSocket reports the prompt finished instead
+            # of polling history; fall back to polling if the socket drops
+            event = threading.Event()
+            with self._pending_lock:
+                self._pending[prompt_id] = event
+
+            try:
+                # The prompt may have finished before we started listening
+                history = self.get_history(prompt_id)
+                if prompt_id in history:
+                    logger.info(f"Prompt {prompt_id} completed")
+                    return history[prompt_id]
+
+                # Sleep until signalled; a dropped socket also wakes waiters
+                remaining = None
+                if timeout:
+                    remaining = max(0.0, timeout - (time.time() - start_time))
+                if self.ws_running and not event.wait(remaining):
+                    raise TimeoutError(f"Prompt {prompt_id} did not complete within {timeout}s")
+
+                if not self.ws_running:
+                    logger.warning("WebSocket disconnected, polling for completion")
+            finally:
+                with self._pending_lock:
+                    self._pending.pop(prompt_id, None)
+
+        # Poll history/{prompt_id}, backing off from 0.1s up to 2s so short
+        # prompts return quickly and long ones don't hammer the server
+        delay = 0.1
         while True:
             if timeout and (time.time() - start_time) > timeout:
                 raise TimeoutError(f"Prompt {prompt_id} did not complete within {timeout}s")
 
             history = self.get_history(prompt_id)
 
-            if prompt_id in history:
+            if history and prompt_id in history:
                 logger.info(f"Prompt {prompt_id} completed")
                 return history[prompt_id]
 
-            time.sleep(1)
+            time.sleep(delay)
+            delay = min(delay * 2, 2.0)
+
+    def close(self):
+        """Disconnect the WebSocket and close pooled HTTP connections"""
+        self.disconnect_websocket()
+        self._session.close()
+
+    def _signal_prompt_done(self, prompt_id: Optional[str]):
+        """Wake a wait_for_completion call blocked on this prompt"""
+        if not prompt_id:
+            return
+
+        with self._pending_lock:
+            event = self._pending.get(prompt_id)
+
+        if event:
+            event.set()
+
+    def _dispatch(self, msg_type: str, callbacks: Tuple[Callable, ...], data: Dict[str, Any]):
+        """Call each WebSocket callback, isolating their errors"""
+        for callback in callbacks:
+            try:
+                callback(data)
+            except Exception as e:
+                logger.error(f"Error in WebSocket callback for {msg_type}: {e}")
+
+    def _coalesce(self, msg_type: str, data: Dict[str, Any]):
+        """
+        Deliver a frame of a coalesced type at most once per window
+
+        A frame arriving inside the window is held, replacing any earlier
+        one; it is delivered before the next other event, or dropped in
+        favour of the first frame past the deadline.
+        """
+        now = time.monotonic()
+        if now < self._coalesce_deadlines.get(msg_type, 0.0):
+            self._latest[msg_type] = data
+            return
+
+        self._latest.pop(msg_type, None)
+        self._coalesce_deadlines[msg_type] = now + self._coalesce_ms[msg_type] / 1000
+        self._dispatch(msg_type, self.ws_callbacks.get(msg_type, ()), data)
+
+    def _flush_coalesced(self):
+        """Deliver every held frame immediately"""
+        while self._latest:
+            msg_type, data = self._latest.popitem()
+            self._dispatch(msg_type, self.ws_callbacks.get(msg_type, ()), data)
+
+    def _wake_pending(self):
+        """Wake every blocked wait_for_completion call (e.g. on disconnect)"""
+        with self._pending_lock:
+            events = list(self._pending.values())
+
+        for event in events:
+            event.set()
 
     def __enter__(self):
         """Context manager entry"""
@@ -328,4 +681,4 @@ class ComfyUIClient:
 
     def __exit__(self, exc_type, exc_val, exc_tb):
         """Context manager exit"""
-        self.disconnect_websocket()
+        self.close()
@@ -2,15 +2,23 @@
 Queue Manager for batch processing and managing multiple ComfyUI workflows
 """
 
+import itertools
+import json
+import sys
 import time
 import threading
-from queue import Queue, Empty
-from typing import Dict, Any, Optional, List, Callable
+from queue import Queue, PriorityQueue
+from typing import Dict, Any, Optional, List, Callable, Set, Tuple, ValuesView
 from pathlib import Path
 from dataclasses import dataclass, field
 from enum import Enum
 import logging
 
+try:
+    import orjson
+except ImportError:  # orjson is optional, fall back to stdlib json
+    orjson = None
+
 logger = logging.getLogger(__name__)
 
 
@@ -23,7 +31,23 @@ class JobStatus(Enum):
     CANCELLED = "cancelled"
 
 
-@dataclass
+# Statuses of finished jobs (removed by clear_completed)
+_TERMINAL_STATES = frozenset({JobStatus.COMPLETED, JobStatus.FAILED, JobStatus.CANCELLED})
+
+# job_queue entries are (priority, seq, job_id); stop() sentinels (job_id
+# None) sort ahead of jobs, which stay in FIFO order by seq
+_STOP_PRIORITY = 0
+_JOB_PRIORITY = 1
+
+
+# Jobs are looked up by job_id, never compared, and large batches create
+# thousands of them, so skip the generated __eq__ and (on 3.10+) __dict__
+_JOB_DATACLASS_OPTIONS = {'eq': False}
+if sys.version_info >= (3, 10):
+    _JOB_DATACLASS_OPTIONS['slots'] = True
+
+
+@dataclass(**_JOB_DATACLASS_OPTIONS)
 class Job:
     """Represents a workflow job"""
     job_id: str
@@ -37,13 +61,152 @@ class Job:
     started_at: Optional[float] = None
     completed_at: Optional[float] = None
     retry_count: int = 0
+    overrides: List[Tuple[str, str, Any]] = field(default_factory=list)
+    body: Optional[bytes] = None
+
+
+def _apply_overrides(workflow: Dict[str, Any],
+                     overrides: List[Tuple[str, str, Any]]) -> Dict[str, Any]:
+    """Apply (node_id, input_name, value) overrides, copying only touched nodes"""
+    if not overrides:
+        return workflow
+
+    result = dict(workflow)
+    copied = set()
+    for node_id, input_name, value in overrides:
+        if node_id not in result:
+            raise KeyError(f"Node not found: {node_id}")
+
+        if node_id not in copied:
+            node = result[node_id]
+            result[node_id] = {**node, 'inputs': dict(node.get('inputs', {}))}
+            copied.add(node_id)
+
+        result[node_id]['inputs'][input_name] = value
+
+    return result
+
+
+def _serialize_workflow(workflow: Dict[str, Any]) -> bytes:
+    """Serialize a workflow to JSON bytes for queue_prompt"""
+    if orjson is not None:
+        return orjson.dumps(workflow)
+    return json.dumps(workflow).encode('utf-8')
+
+
+class MetadataWriter:
+    """Writes job history metadata to JSON files on a background thread"""
+
+    def __init__(self, output_dir: Path, jsonl_name: Optional[str] = None):
+        """
+        Initialize Metadata Writer
+
+        Args:
+            output_dir: Directory to write {prompt_id}_metadata.json files to
+            jsonl_name: If set, append every entry as one JSON line
+                        ({"prompt_id": ..., "history": ...}) to this file in
+                        output_dir instead of writing one file per prompt
+        """
+        self.output_dir = output_dir
+        self.jsonl_path = output_dir / jsonl_name if jsonl_name else None
+        self._queue: Queue = Queue()
+        self._thread: Optional[threading.Thread] = None
+
+    def start(self):
+        """Start the writer thread"""
+        if self._thread is not None:
+            return
+
+        self.output_dir.mkdir(parents=True, exist_ok=True)
+        self._thread = threading.Thread(target=self._run, name="MetadataWriter")
+        self._thread.daemon = True
+        self._thread.start()
+
+    def stop(self, wait: bool = True):
+        """
+        Stop the writer thread
+
+        Args:
+            wait: Wait for pending writes to finish
+        """
+        if self._thread is None:
+            return
+
+        self._queue.put(None)
+        if wait:
+            self._thread.join()
+        self._thread = None
+
+    def submit(self, prompt_id: str, history: Dict[str, Any]) -> Path:
+        """
+        Queue metadata for writing
+
+        Args:
+            prompt_id: Prompt the history belongs to
+            history: History data to write
+
+        Returns:
+            Path the metadata will be written to
+        """
+        if self.jsonl_path:
+            self._queue.put((prompt_id, history))
+            return self.jsonl_path
+
+        path = self.output_dir / f"{prompt_id}_metadata.json"
+        self._queue.put((path, history))
+        return path
+
+    def _run(self):
+        """Writer thread function"""
+        if self.jsonl_path:
+            with open(self.jsonl_path, 'ab') as f:
+                self._run_jsonl(f)
+            return
+
+        while True:
+            item = self._queue.get()
+            if item is None:
+                break
+
+            path, history = item
+            try:
+                if orjson is not None:
+                    data = orjson.dumps(history, option=orjson.OPT_INDENT_2)
+                else:
+                    data = json.dumps(history, indent=2).encode('utf-8')
+
+                with open(path, 'wb') as f:
+                    f.write(data)
+            except Exception as e:
+                logger.error(f"Failed to write metadata {path}: {e}")
+
+    def _run_jsonl(self, f):
+        """Append entries to an open JSON Lines file"""
+        while True:
+            item = self._queue.get()
+            if item is None:
+                break
+
+            prompt_id, history = item
+            try:
+                entry = {'prompt_id': prompt_id, 'history': history}
+                if orjson is not None:
+                    line = orjson.dumps(entry, option=orjson.OPT_APPEND_NEWLINE)
+                else:
+                    line = json.dumps(entry).encode('utf-8') + b'\n'
+
+                f.write(line)
+                f.flush()
+            except Exception as e:
+                logger.error(f"Failed to write metadata for {prompt_id}: {e}")
 
 
 class QueueManager:
     """Manages batch processing of ComfyUI workflows with concurrency control"""
 
     def __init__(self, client, max_concurrent: int = 3,
-                 retry_on_failure: bool = True, max_retries: int = 3):
+                 retry_on_failure: bool = True, max_retries: int = 3,
+                 metadata_writer: Optional[MetadataWriter] = None):
         """
         Initialize Queue Manager
 
@@ -52,20 +215,44 @@ class QueueManager:
             max_concurrent: Maximum number of concurrent jobs
             retry_on_failure: Retry failed jobs
             max_retries: Maximum retry attempts
+            metadata_writer: Optional writer that receives the history of
+                             each completed job
         """
         self.client = client
         self.max_concurrent = max_concurrent
         self.retry_on_failure = retry_on_failure
         self.max_retries = max_retries
+        self.metadata_writer = metadata_writer
 
-        self.job_queue: Queue = Queue()
+        self.job_queue: PriorityQueue = PriorityQueue()
+        self._seq = itertools.count()
         self.jobs: Dict[str, Job] = {}
-        self.running_jobs: List[str] = []
+
+        # job_ids grouped by status, kept in step with job.status via _set_status
+        self._by_status: Dict[JobStatus, Set[str]] = {s: set() for s in JobStatus}
+        self._status_lock = threading.Lock()
+
+        self.running_jobs: Set[str] = set()
+        self._running_lock = threading.Lock()
+
+        # Queued jobs (including retries) not yet finished by a worker;
+        # wait_for_completion blocks on the condition until this reaches zero
+        self._outstanding = 0
+        self._outstanding_cond = threading.Condition()
+
+        # One slot per concurrently running job; workers block until one frees.
+        # Only contended when start() is given more workers than max_concurrent
+        self._slots = threading.BoundedSemaphore(max_concurrent)
 
         self.workers: List[threading.Thread] = []
         self.running = False
         self.paused = False
 
+        # Cleared while paused; workers wait on it before taking and before
+        # running a job
+        self._unpaused = threading.Event()
+        self._unpaused.set()
+
         self.callbacks: Dict[str, List[Callable]] = {
             'job_started': [],
             'job_completed': [],
@@ -77,7 +264,8 @@ class QueueManager:
         logger.info(f"Initialized Queue Manager (max_concurrent={max_concurrent})")
 
     def add_job(self, job_id: str, workflow: Dict[str, Any],
-                metadata: Optional[Dict[str, Any]] = None) -> Job:
+                metadata: Optional[Dict[str, Any]] = None,
+                overrides: Optional[List[Tuple[str, str, Any]]] = None) -> Job:
         """
         Add a job to the queue
 
@@ -85,24 +273,79 @@ class QueueManager:
             job_id: Unique job identifier
             workflow: ComfyUI workflow dictionary
             metadata: Optional metadata for the job
+            overrides: Optional (node_id, input_name, value) updates; the
+                       job's workflow gets copies of the touched nodes, the
+                       given workflow itself is not modified, so one base
+                       workflow can back many jobs
+
+        The job's workflow is serialized when the job is first sent (after
+        job_started callbacks run) and the bytes are reused for retries, so
+        changes to job.workflow made before then are sent.
 
         Returns:
             Created Job object
         """
+        job = self._make_job(job_id, workflow, metadata, overrides)
+
+        self.jobs[job_id] = job
+        with self._status_lock:
+            self._by_status[job.status].add(job_id)
+        self._enqueue(job_id)
+
+        logger.info(f"Added job to queue: {job_id}")
+        return job
+
+    def _make_job(self, job_id: str, workflow: Dict[str, Any],
+                  metadata: Optional[Dict[str, Any]] = None,
+                  overrides: Optional[List[Tuple[str, str, Any]]] = None) -> Job:
+        """Create a Job with its overrides applied (not yet queued)"""
         if job_id in self.jobs:
             raise ValueError(f"Job ID already exists: {job_id}")
 
+        overrides = list(overrides or [])
         job = Job(
             job_id=job_id,
-            workflow=workflow,
-            metadata=metadata or {}
+            workflow=_apply_overrides(workflow, overrides),
+            metadata=metadata or {},
+            overrides=overrides
         )
+        return job
 
-        self.jobs[job_id] = job
-        self.job_queue.put(job_id)
+    def _enqueue(self, job_id: str, seq: Optional[int] = None):
+        """
+        Hand a job to the workers, counting it as outstanding
 
-        logger.info(f"Added job to queue: {job_id}")
-        return job
+        Args:
+            job_id: Job identifier
+            seq: Original queue position when handing a job back
+        """
+        if seq is None:
+            seq = next(self._seq)
+        with self._outstanding_cond:
+            self._outstanding += 1
+        self.job_queue.put((_JOB_PRIORITY, seq, job_id))
+
+    def _job_done(self):
+        """Mark one queued job as finished, waking waiters once none remain"""
+        with self._outstanding_cond:
+            self._outstanding -= 1
+            if not self._outstanding:
+                self._outstanding_cond.notify_all()
+
+    def _add_jobs_bulk(self, jobs: List[Job]):
+        """
+        Register and enqueue several jobs
+
+        Args:
+            jobs: Jobs created by _make_job
+        """
+        self.jobs.update((job.job_id, job) for job in jobs)
+        with self._status_lock:
+            for job in jobs:
+                self._by_status[job.status].add(job.job_id)
+
+        for job in jobs:
+            self._enqueue(job.job_id)
 
     def add_jobs_from_list(self, workflows: List[Dict[str, Any]],
                           job_prefix: str = "job") -> List[Job]:
@@ -117,10 +360,12 @@ class QueueManager:
             List of created Job objects
         """
         jobs = []
+        timestamp = int(time.time())
         for i, workflow in enumerate(workflows):
-            job_id = f"{job_prefix}_{i:04d}_{int(time.time())}"
-            job = self.add_job(job_id, workflow)
-            jobs.append(job)
+            job_id = f"{job_prefix}_{i:04d}_{timestamp}"
+            jobs.append(self._make_job(job_id, workflow))
+
+        self._add_jobs_bulk(jobs)
 
         logger.info(f"Added {len(jobs)} jobs to queue")
         return jobs
@@ -136,11 +381,33 @@ class QueueManager:
 
     def get_all_jobs(self) -> List[Job]:
         """Get all jobs"""
-        return list(self.jobs.values())
+        return list(self.get_all_jobs_view())
+
+    def get_all_jobs_view(self) -> ValuesView[Job]:
+        """
+        Get a live, read-only view of all jobs without copying
+
+        The view reflects jobs added or cleared later; use get_all_jobs for
+        a snapshot if jobs may be added while iterating.
+        """
+        return self.jobs.values()
 
     def get_jobs_by_status(self, status: JobStatus) -> List[Job]:
         """Get jobs with specific status"""
-        return [job for job in self.jobs.values() if job.status == status]
+        with self._status_lock:
+            job_ids = list(self._by_status[status])
+        jobs = (self.jobs.get(job_id) for job_id in job_ids)
+        return [job for job in jobs if job is not None]
+
+    def _set_status(self, job: Job, status: JobStatus):
+        """Move a job to a new status, keeping the status index in step"""
+        with self._status_lock:
+            # A job removed by clear_completed (e.g. cancelled while running)
+            # still gets its status, but must not re-enter the index
+            if self.jobs.get(job.job_id) is job:
+                self._by_status[job.status].discard(job.job_id)
+                self._by_status[status].add(job.job_id)
+            job.status = status
 
     def cancel_job(self, job_id: str) -> bool:
         """
@@ -157,7 +424,7 @@ class QueueManager:
             return False
 
         if job.status == JobStatus.PENDING:
-            job.status = JobStatus.CANCELLED
+            self._set_status(job, JobStatus.CANCELLED)
             self._trigger_callbacks('job_cancelled', job)
             logger.info(f"Cancelled pending job: {job_id}")
             return True
@@ -166,7 +433,7 @@ class QueueManager:
             try:
                 # Try to interrupt the execution
                 self.client.interrupt_execution()
-                job.status = JobStatus.CANCELLED
+                self._set_status(job, JobStatus.CANCELLED)
                 self._trigger_callbacks('job_cancelled', job)
                 logger.info(f"Cancelled running job: {job_id}")
                 return True
@@ -184,24 +451,30 @@ class QueueManager:
 
         try:
             # Update status
-            job.status = JobStatus.RUNNING
+            self._set_status(job, JobStatus.RUNNING)
             job.started_at = time.time()
-            self.running_jobs.append(job_id)
+            with self._running_lock:
+                self.running_jobs.add(job_id)
 
             logger.info(f"Processing job: {job_id}")
             self._trigger_callbacks('job_started', job)
 
-            # Queue the workflow
-            response = self.client.queue_prompt(job.workflow)
+            # Queue the workflow, serialized once and reused for retries
+            if job.body is None:
+                job.body = _serialize_workflow(job.workflow)
+            response = self.client.queue_prompt(job.body)
             job.prompt_id = response.get('prompt_id')
 
             # Wait for completion
             if job.prompt_id:
                 history = self.client.wait_for_completion(job.prompt_id)
                 job.result = history
-                job.status = JobStatus.COMPLETED
+                self._set_status(job, JobStatus.COMPLETED)
                 job.completed_at = time.time()
 
+                if self.metadata_writer:
+                    self.metadata_writer.submit(job.prompt_id, history)
+
                 logger.info(f"Job completed: {job_id} (prompt_id: {job.prompt_id})")
                 self._trigger_callbacks('job_completed', job)
             else:
@@ -215,50 +488,55 @@ class QueueManager:
             # Retry logic
             if self.retry_on_failure and job.retry_count <= self.max_retries:
                 logger.info(f"Retrying job {job_id} (attempt {job.retry_count}/{self.max_retries})")
-                job.status = JobStatus.PENDING
-                self.job_queue.put(job_id)
+                self._set_status(job, JobStatus.PENDING)
+                self._enqueue(job_id)
             else:
-                job.status = JobStatus.FAILED
+                self._set_status(job, JobStatus.FAILED)
                 job.completed_at = time.time()
                 self._trigger_callbacks('job_failed', job)
 
         finally:
-            if job_id in self.running_jobs:
-                self.running_jobs.remove(job_id)
+            with self._running_lock:
+                self.running_jobs.discard(job_id)
 
     def _worker(self):
         """Worker thread function"""
-        while self.running:
-            try:
-                # Wait if paused
-                while self.paused and self.running:
-                    time.sleep(0.5)
-
-                # Check concurrent limit
-                while len(self.running_jobs) >= self.max_concurrent and self.running:
-                    time.sleep(0.5)
+        while True:
+            # Wait if paused
+            self._unpaused.wait()
 
-                if not self.running:
+            # Block until a job arrives; stop() sends None to end the worker
+            _, seq, job_id = self.job_queue.get()
+            try:
+                if job_id is None:
                     break
 
-                # Get next job
-                try:
-                    job_id = self.job_queue.get(timeout=1)
-                except Empty:
+                # Paused while blocked in get(): hold the job until resumed.
+                # If stop() ends the wait instead, hand the job back in its
+                # original place and pick up this worker's sentinel
+                self._unpaused.wait()
+                if not self.running:
+                    self._enqueue(job_id, seq)
                     continue
 
                 # Check if job was cancelled
                 job = self.get_job(job_id)
                 if job and job.status == JobStatus.CANCELLED:
-                    self.job_queue.task_done()
                     continue
 
-                # Process job
-                self._process_job(job_id)
-                self.job_queue.task_done()
+                # Process job once a concurrency slot is free; it may have
+                # been cancelled while waiting for one
+                with self._slots:
+                    if job and job.status == JobStatus.CANCELLED:
+                        continue
+                    self._process_job(job_id)
 
             except Exception as e:
                 logger.error(f"Worker error: {e}")
+            finally:
+                if job_id is not None:
+                    self._job_done()
+                self.job_queue.task_done()
 
     def start(self, num_workers: Optional[int] = None):
         """
@@ -273,6 +551,11 @@ class QueueManager:
 
         num_workers = num_workers or self.max_concurrent
         self.running = True
+        if self.paused:
+            self._unpaused.clear()
+
+        if self.metadata_writer:
+            self.metadata_writer.start()
 
         for i in range(num_workers):
             worker = threading.Thread(target=self._worker, name=f"Worker-{i}")
@@ -287,26 +570,42 @@ class QueueManager:
         Stop processing jobs
 
         Args:
-            wait: Wait for current jobs to complete
+            wait: Wait for current jobs to complete (pending metadata
+                  writes are flushed either way)
         """
         logger.info("Stopping queue manager...")
         self.running = False
 
+        # One sentinel per worker; they sort ahead of queued jobs so those
+        # stay queued for a later start(). Paused workers are released to
+        # pick them up
+        for _ in self.workers:
+            self.job_queue.put((_STOP_PRIORITY, next(self._seq), None))
+        self._unpaused.set()
+
         if wait:
             for worker in self.workers:
                 worker.join()
 
         self.workers.clear()
+
+        # Metadata queued for finished jobs is always flushed, even when the
+        # workers are abandoned; the writer is a daemon thread and would
+        # otherwise lose it at exit
+        if self.metadata_writer:
+            self.metadata_writer.stop(wait=True)
         logger.info("Queue manager stopped")
 
     def pause(self):
         """Pause job processing"""
+        self._unpaused.clear()
         self.paused = True
         logger.info("Queue manager paused")
 
     def resume(self):
         """Resume job processing"""
         self.paused = False
+        self._unpaused.set()
         logger.info("Queue manager resumed")
 
     def wait_for_completion(self, timeout: Optional[float] = None):
@@ -316,25 +615,34 @@ class QueueManager:
         Args:
             timeout: Optional timeout in seconds
         """
-        start_time = time.time()
-
-        while not self.job_queue.empty() or self.running_jobs:
-            if timeout and (time.time() - start_time) > timeout:
-                raise TimeoutError("Queue did not complete within timeout")
-            time.sleep(0.5)
+        deadline = time.monotonic() + timeout if timeout else None
+
+        # Every queued job (including retries) is marked done by a worker, so
+        # block until nothing is outstanding. Waits are sliced so
+        # KeyboardInterrupt is still delivered promptly.
+        with self._outstanding_cond:
+            while self._outstanding:
+                wait_time = 1.0
+                if deadline is not None:
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        raise TimeoutError("Queue did not complete within timeout")
+                    wait_time = min(wait_time, remaining)
+                self._outstanding_cond.wait(wait_time)
 
         logger.info("All jobs completed")
         self._trigger_callbacks('queue_empty', None)
 
     def get_statistics(self) -> Dict[str, Any]:
         """Get queue statistics"""
+        by_status = self._by_status
         stats = {
             'total_jobs': len(self.jobs),
-            'pending': len(self.get_jobs_by_status(JobStatus.PENDING)),
-            'running': len(self.get_jobs_by_status(JobStatus.RUNNING)),
-            'completed': len(self.get_jobs_by_status(JobStatus.COMPLETED)),
-            'failed': len(self.get_jobs_by_status(JobStatus.FAILED)),
-            'cancelled': len(self.get_jobs_by_status(JobStatus.CANCELLED)),
+            'pending': len(by_status[JobStatus.PENDING]),
+            'running': len(by_status[JobStatus.RUNNING]),
+            'completed': len(by_status[JobStatus.COMPLETED]),
+            'failed': len(by_status[JobStatus.FAILED]),
+            'cancelled': len(by_status[JobStatus.CANCELLED]),
             'queue_size': self.job_queue.qsize(),
             'is_running': self.running,
             'is_paused': self.paused,
@@ -366,12 +674,13 @@ class QueueManager:
 
     def clear_completed(self):
         """Remove completed jobs from history"""
-        completed = [
-            job_id for job_id, job in self.jobs.items()
-            if job.status in [JobStatus.COMPLETED, JobStatus.FAILED, JobStatus.CANCELLED]
-        ]
-
-        for job_id in completed:
-            del self.jobs[job_id]
+        completed = []
+        with self._status_lock:
+            for status in _TERMINAL_STATES:
+                completed.extend(self._by_status[status])
+                self._by_status[status].clear()
+
+            for job_id in completed:
+                self.jobs.pop(job_id, None)
 
         logger.info(f"Cleared {len(completed)} completed jobs")
@@ -2,10 +2,23 @@
 Utility functions for ComfyUI API Interface
 """
 
+import copy
+import functools
+import json
 import yaml
 import logging
 from pathlib import Path
-from typing import Dict, Any, Optional
+from typing import Dict, Any, Iterator, Optional, Union
+
+try:
+    import orjson
+except ImportError:  # orjson is optional, fall back to stdlib json
+    orjson = None
+
+try:
+    from yaml import CSafeLoader as _YamlLoader
+except ImportError:  # PyYAML built without libyaml
+    from yaml import SafeLoader as _YamlLoader
 
 
 def load_config(config_path: Path) -> Dict[str, Any]:
@@ -21,10 +34,50 @@ def load_config(config_path: Path) -> Dict[str, Any]:
     if not config_path.exists():
         raise FileNotFoundError(f"Config file not found: {config_path}")
 
-    with open(config_path, 'r', encoding='utf-8') as f:
-        config = yaml.safe_load(f)
+    # Parsed configs are cached per (path, mtime), so repeated calls in one
+    # process only re-parse the YAML after the file changes
+    config = _load_config_cached(str(config_path.resolve()),
+                                 config_path.stat().st_mtime_ns)
+
+    return copy.deepcopy(config)
+
+
+@functools.lru_cache(maxsize=8)
+def _load_config_cached(config_path: str, mtime_ns: int) -> Dict[str, Any]:
+    """Parse a YAML config file (cached by load_config)"""
+    with open(config_path, 'rb') as f:
+        return yaml.load(f, Loader=_YamlLoader)
+
+
+def json_loads(data: Union[str, bytes]) -> Any:
+    """
+    Parse JSON data, using orjson when available
+
+    Args:
+        data: JSON document as str or bytes
+
+    Returns:
+        Parsed Python object
+    """
+    if orjson is not None:
+        return orjson.loads(data)
+    return json.loads(data)
+
+
+def json_dumps(obj: Any, indent: bool = False) -> bytes:
+    """
+    Serialize an object to UTF-8 encoded JSON bytes, using orjson when available
+
+    Args:
+        obj: Object to serialize
+        indent: Pretty-print with a 2-space indent
 
-    return config
+    Returns:
+        JSON document as bytes
+    """
+    if orjson is not None:
+        return orjson.dumps(obj, option=orjson.OPT_INDENT_2 if indent else 0)
+    return json.dumps(obj, indent=2 if indent else None).encode('utf-8')
 
 
 def setup_logging(config: Dict[str, Any]):
@@ -39,25 +92,25 @@ def setup_logging(config: Dict[str, Any]):
     log_file = log_config.get('file')
     console = log_config.get('console', True)
 
+    formatter = logging.Formatter('%(asctime)s - %(name)s - %(levelname)s - %(message)s')
     handlers = []
 
     if console:
         console_handler = logging.StreamHandler()
-        console_handler.setFormatter(
-            logging.Formatter('%(asctime)s - %(name)s - %(levelname)s - %(message)s')
-        )
+        console_handler.setFormatter(formatter)
         handlers.append(console_handler)
 
     if log_file:
         file_handler = logging.FileHandler(log_file)
-        file_handler.setFormatter(
-            logging.Formatter('%(asctime)s - %(name)s - %(levelname)s - %(message)s')
-        )
+        file_handler.setFormatter(formatter)
         handlers.append(file_handler)
 
+    # force replaces (and closes) handlers from any earlier call, which
+    # basicConfig would otherwise keep while ignoring the new configuration
     logging.basicConfig(
         level=level,
-        handlers=handlers
+        handlers=handlers,
+        force=True
     )
 
 
@@ -100,27 +153,41 @@ def format_bytes(bytes_size: int) -> str:
     return f"{bytes_size:.2f} PB"
 
 
-def extract_output_images(history_data: Dict[str, Any]) -> list:
+def iter_output_images(history_data: Dict[str, Any]) -> Iterator[Dict[str, Any]]:
+    """
+    Iterate over output image information in history data
+
+    Args:
+        history_data: ComfyUI history response
+
+    Yields:
+        Output image info dictionaries
+    """
+    outputs = history_data.get('outputs') or {}
+    for node_id, node_output in outputs.items():
+        for img in node_output.get('images', ()):
+            yield {
+                'node_id': node_id,
+                'filename': img.get('filename'),
+                'subfolder': img.get('subfolder', ''),
+                'type': img.get('type', 'output')
+            }
+
+
+def extract_output_images_list(history_data: Dict[str, Any]) -> list:
     """
     Extract output image information from history data
 
+    Use iter_output_images() when the images are only consumed once.
+
     Args:
         history_data: ComfyUI history response
 
     Returns:
         List of output image info dictionaries
     """
-    images = []
+    return list(iter_output_images(history_data))
 
-    outputs = history_data.get('outputs', {})
-    for node_id, node_output in outputs.items():
-        if 'images' in node_output:
-            for img in node_output['images']:
-                images.append({
-                    'node_id': node_id,
-                    'filename': img.get('filename'),
-                    'subfolder': img.get('subfolder', ''),
-                    'type': img.get('type', 'output')
-                })
-
-    return images
+
+# Original name, kept for existing callers
+extract_output_images = extract_output_images_list
@@ -4,12 +4,227 @@ Workflow Manager for loading, validating, and managing ComfyUI workflows
 
 import json
 import copy
+import functools
+import math
+import mmap
+import os
+import pickle
+import sys
+from concurrent.futures import ThreadPoolExecutor
+import hashlib
+import threading
+from collections import OrderedDict
 from pathlib import Path
-from typing import Dict, Any, Optional, List
+from typing import Dict, Any, Iterable, Optional, List, Mapping, Tuple, Union
 import logging
 
+try:
+    import orjson
+except ImportError:  # orjson is optional, fall back to stdlib json
+    orjson = None
+
 logger = logging.getLogger(__name__)
 
+def _json_loads(data: Union[str, bytes]) -> Any:
+    """
+    Parse JSON, using orjson when installed
+
+    orjson rejects the NaN/Infinity literals that json.dumps writes, so
+    documents it cannot parse are retried with stdlib json; either way
+    invalid JSON raises json.JSONDecodeError.
+    """
+    if orjson is not None:
+        try:
+            return orjson.loads(data)
+        except orjson.JSONDecodeError:
+            pass
+    return json.loads(data)
+
+
+def _has_non_finite(obj: Any) -> bool:
+    """Check whether JSON-like data holds a NaN or infinite float"""
+    stack = [obj]
+    while stack:
+        item = stack.pop()
+        if isinstance(item, float):
+            if not math.isfinite(item):
+                return True
+        elif isinstance(item, dict):
+            stack.extend(item.values())
+        elif isinstance(item, (list, tuple)):
+            stack.extend(item)
+    return False
+
+
+def _json_dumps(obj: Any, pretty: bool = False) -> bytes:
+    """
+    Serialize an object to UTF-8 JSON bytes
+
+    Args:
+        obj: Object to serialize
+        pretty: 2-space indent with a trailing newline instead of compact output
+    """
+    if orjson is not None:
+        option = orjson.OPT_NON_STR_KEYS
+        if pretty:
+            option |= orjson.OPT_INDENT_2 | orjson.OPT_APPEND_NEWLINE
+        data = orjson.dumps(obj, option=option)
+
+        # orjson writes NaN/Infinity as null; stdlib json keeps them, so
+        # output that may hold one is re-encoded (the walk only runs then)
+        if b'null' not in data or not _has_non_finite(obj):
+            return data
+
+    if pretty:
+        return json.dumps(obj, indent=2).encode('utf-8') + b'\n'
+    return json.dumps(obj, separators=(',', ':')).encode('utf-8')
+
+
+def _fast_clone(obj: Any) -> Any:
+    """
+    Deep copy workflow data via a pickle round trip
+
+    Much faster than copy.deepcopy for workflow graphs, and types are
+    preserved (tuples, floats such as NaN, datetime or UUID values and
+    other picklable objects come back as they went in). Unpicklable data
+    falls back to copy.deepcopy.
+    """
+    try:
+        return pickle.loads(pickle.dumps(obj, protocol=pickle.HIGHEST_PROTOCOL))
+    except Exception:
+        return copy.deepcopy(obj)
+
+
+# Sentinel for absent dictionary keys
+_MISSING = object()
+
+# Validation results keyed by workflow fingerprint, shared across managers
+VALIDATION_CACHE_SIZE = 256
+_validation_cache: "OrderedDict[bytes, Tuple[bool, Tuple[str, ...]]]" = OrderedDict()
+_validation_cache_lock = threading.Lock()
+
+# Threads only validate in parallel without a GIL (Python 3.13+ "t" builds)
+_FREE_THREADED = sys.version_info >= (3, 13) and not sys._is_gil_enabled()
+PARALLEL_VALIDATION_MIN_NODES = 10000
+
+
+def _get_cached_validation(fingerprint: bytes) -> Optional[Tuple[bool, List[str]]]:
+    """Look up a validation result by fingerprint, refreshing its LRU position"""
+    with _validation_cache_lock:
+        cached = _validation_cache.get(fingerprint)
+        if cached is None:
+            return None
+        _validation_cache.move_to_end(fingerprint)
+
+    logger.debug("Workflow validation cache hit")
+    return cached[0], list(cached[1])
+
+
+def _store_validation(fingerprint: bytes, is_valid: bool, errors: List[str]):
+    """Cache a validation result, evicting the least recently used entry"""
+    with _validation_cache_lock:
+        _validation_cache[fingerprint] = (is_valid, tuple(errors))
+        if len(_validation_cache) > VALIDATION_CACHE_SIZE:
+            _validation_cache.popitem(last=False)
+
+
+def _write_atomic(path: Path, data: bytes):
+    """
+    Write a file via a temporary sibling renamed into place
+
+    Readers never see a partially written file, and the temp name is
+    unique, so concurrent writes of the same path never write into each
+    other's file. It is created like open() would, so the umask applies;
+    an existing file's mode is kept.
+    """
+    token = os.urandom(6).hex()
+    tmp_path = path.with_name(f".{path.name}.{token}.tmp")
+    fd = os.open(tmp_path, os.O_WRONLY | os.O_CREAT | os.O_EXCL, 0o666)
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            try:
+                os.chmod(tmp_path, path.stat().st_mode & 0o7777)
+            except FileNotFoundError:
+                pass
+            f.write(data)
+        os.replace(tmp_path, path)
+    except BaseException:
+        try:
+            os.unlink(tmp_path)
+        except OSError:
+            pass
+        raise
+
+
+# Files larger than this are parsed from a memory map instead of a read() copy
+MMAP_THRESHOLD = 1 << 20
+
+
+def _parse_workflow_file(workflow_path: Union[str, Path]) -> Dict[str, Any]:
+    """
+    Read and parse a workflow JSON file
+
+    Large files are handed to orjson as a view of a read-only memory map,
+    so the file contents are never copied into a bytes object.
+    """
+    with open(workflow_path, 'rb') as f:
+        if orjson is not None and os.fstat(f.fileno()).st_size > MMAP_THRESHOLD:
+            with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+                with memoryview(mm) as view:
+                    try:
+                        return orjson.loads(view)
+                    except orjson.JSONDecodeError:
+                        pass
+                # e.g. NaN literals, see _json_loads
+                return json.loads(mm[:])
+
+        return _json_loads(f.read())
+
+
+@functools.lru_cache(maxsize=64)
+def _load_workflow_cached(workflow_path: str, mtime_ns: int, size: int) -> Dict[str, Any]:
+    """Parse a workflow file (cached by load_workflow)"""
+    return _parse_workflow_file(workflow_path)
+
+
+def _validate_nodes(items: Iterable[Tuple[str, Any]]) -> Tuple[bool, List[str]]:
+    """
+    Validate workflow nodes
+
+    Args:
+        items: (node_id, node_data) pairs
+
+    Returns:
+        Tuple of (whether any node has a class_type, list of error messages)
+    """
+    errors: List[str] = []
+
+    # Nodes are indexed directly and the rare malformed ones caught, which
+    # keeps type checks off the common path (hot loop: bind lookups to locals)
+    append = errors.append
+    is_instance = isinstance
+    has_node = False
+    for node_id, node_data in items:
+        try:
+            node_data['class_type']
+            has_node = True
+        except KeyError:
+            append(f"Node {node_id}: Missing 'class_type' field")
+        except (TypeError, IndexError):
+            # Not a mapping (list, string, number or null)
+            append(f"Node {node_id}: Invalid node data type")
+            continue
+
+        try:
+            inputs = node_data['inputs']
+        except KeyError:
+            append(f"Node {node_id}: Missing 'inputs' field")
+        else:
+            if not is_instance(inputs, dict):
+                append(f"Node {node_id}: 'inputs' must be a dictionary")
+
+    return has_node, errors
+
 
 class WorkflowManager:
     """Manages ComfyUI workflows with validation and templating support"""
@@ -18,51 +233,103 @@ class WorkflowManager:
         """Initialize Workflow Manager"""
         self.workflows: Dict[str, Dict[str, Any]] = {}
         self.templates: Dict[str, Dict[str, Any]] = {}
+        # class_type -> node ids for each registered workflow
+        self._type_index: Dict[str, Dict[str, List[str]]] = {}
 
     @staticmethod
-    def load_workflow(workflow_path: Path) -> Dict[str, Any]:
+    def load_workflow(workflow_path: Path, cached: bool = False) -> Dict[str, Any]:
         """
         Load a workflow from JSON file
 
         Args:
             workflow_path: Path to workflow JSON file
+            cached: Return a parse shared between cached loads of the same
+                    file, skipping the read and parse when the file's
+                    mtime and size are unchanged. The result must not be
+                    mutated in place (use with_override or copy it).
 
         Returns:
             Workflow dictionary
         """
-        if not workflow_path.exists():
-            raise FileNotFoundError(f"Workflow not found: {workflow_path}")
-
         try:
-            with open(workflow_path, 'r', encoding='utf-8') as f:
-                workflow = json.load(f)
-
-            logger.info(f"Loaded workflow from {workflow_path}")
-            return workflow
-
-        except json.JSONDecodeError as e:
-            logger.error(f"Invalid JSON in workflow file: {e}")
+            if cached:
+                stat = workflow_path.stat()
+                workflow = _load_workflow_cached(str(workflow_path.resolve()),
+                                                 stat.st_mtime_ns, stat.st_size)
+            else:
+                # Open first rather than checking exists(): one stat fewer,
+                # and parse straight from bytes, skipping a text decode
+                workflow = _parse_workflow_file(workflow_path)
+
+        except FileNotFoundError:
+            raise FileNotFoundError(f"Workflow not found: {workflow_path}") from None
+        except (json.JSONDecodeError, UnicodeDecodeError) as e:
+            logger.error("Invalid JSON in workflow file: %s", e)
             raise ValueError(f"Invalid workflow JSON: {e}")
 
+        logger.info("Loaded workflow from %s", workflow_path)
+        return workflow
+
     @staticmethod
-    def save_workflow(workflow: Dict[str, Any], output_path: Path):
+    def save_workflow(workflow: Dict[str, Any], output_path: Path, pretty: bool = True,
+                      skip_if_unchanged: bool = False):
         """
         Save a workflow to JSON file
 
+        The file is written to a temporary sibling and renamed into place,
+        so readers never see a partially written workflow.
+
         Args:
             workflow: Workflow dictionary
             output_path: Path to save workflow
+            pretty: Indent the JSON; pass False for compact machine-read files
+            skip_if_unchanged: Leave the file (and its mtime) alone when it
+                               already holds exactly these bytes; costs a
+                               read of the existing file when sizes match
         """
         try:
+            data = _json_dumps(workflow, pretty=pretty)
+
+            # Sizes are compared first so differing files are never read
+            if skip_if_unchanged:
+                try:
+                    unchanged = (output_path.stat().st_size == len(data)
+                                 and output_path.read_bytes() == data)
+                except FileNotFoundError:
+                    unchanged = False
+
+                if unchanged:
+                    logger.debug("Workflow unchanged, not saving %s", output_path)
+                    return
+
             output_path.parent.mkdir(parents=True, exist_ok=True)
+            _write_atomic(output_path, data)
+
+            logger.info("Saved workflow to %s", output_path)
+
+        except Exception as e:
+            logger.error("Failed to save workflow: %s", e)
+            raise
+
+    @staticmethod
+    def save_workflow_bytes(data: bytes, output_path: Path):
+        """
+        Save already serialized workflow JSON, e.g. an upload kept byte for byte
+
+        Written atomically like save_workflow.
 
-            with open(output_path, 'w', encoding='utf-8') as f:
-                json.dump(workflow, f, indent=2)
+        Args:
+            data: Workflow JSON bytes
+            output_path: Path to save workflow
+        """
+        try:
+            output_path.parent.mkdir(parents=True, exist_ok=True)
+            _write_atomic(output_path, data)
 
-            logger.info(f"Saved workflow to {output_path}")
+            logger.info("Saved workflow to %s", output_path)
 
         except Exception as e:
-            logger.error(f"Failed to save workflow: {e}")
+            logger.error("Failed to save workflow: %s", e)
             raise
 
     @staticmethod
@@ -86,57 +353,177 @@ class WorkflowManager:
             errors.append("Workflow is empty")
             return False, errors
 
-        # Check if nodes exist
-        if not any(isinstance(v, dict) and 'class_type' in v for v in workflow.values()):
-            errors.append("Workflow contains no valid nodes")
+        has_node, errors = _validate_nodes(workflow.items())
+        return WorkflowManager._finish_validation(has_node, errors)
 
-        # Validate each node
-        for node_id, node_data in workflow.items():
-            if not isinstance(node_data, dict):
-                errors.append(f"Node {node_id}: Invalid node data type")
-                continue
-
-            if 'class_type' not in node_data:
-                errors.append(f"Node {node_id}: Missing 'class_type' field")
-
-            if 'inputs' not in node_data:
-                errors.append(f"Node {node_id}: Missing 'inputs' field")
-            elif not isinstance(node_data['inputs'], dict):
-                errors.append(f"Node {node_id}: 'inputs' must be a dictionary")
+    @staticmethod
+    def _finish_validation(has_node: bool, errors: List[str]) -> tuple[bool, List[str]]:
+        """Add the overall no-nodes error and log the validation outcome"""
+        # Reported ahead of the per-node errors, as the overall problem
+        if not has_node:
+            errors.insert(0, "Workflow contains no valid nodes")
 
         is_valid = len(errors) == 0
         if is_valid:
             logger.info("Workflow validation passed")
         else:
-            logger.warning(f"Workflow validation failed: {len(errors)} errors")
+            logger.warning("Workflow validation failed: %s errors", len(errors))
+
+        return is_valid, errors
+
+    @staticmethod
+    def validate_workflow_parallel(workflow: Dict[str, Any],
+                                   workers: int = 4) -> tuple[bool, List[str]]:
+        """
+        Validate a very large workflow using several threads
+
+        Node chunks are only validated concurrently on free-threaded
+        (no-GIL) Python builds; elsewhere threads would just take turns on
+        the GIL, so this is the same as validate_workflow.
+
+        Args:
+            workflow: Workflow dictionary to validate
+            workers: Number of threads (and node chunks)
+
+        Returns:
+            Tuple of (is_valid, list of error messages), as validate_workflow
+        """
+        if (not _FREE_THREADED or workers < 2 or not isinstance(workflow, dict)
+                or len(workflow) < PARALLEL_VALIDATION_MIN_NODES):
+            return WorkflowManager.validate_workflow(workflow)
+
+        items = list(workflow.items())
+        chunk_size = -(-len(items) // workers)
+        chunks = [items[i:i + chunk_size] for i in range(0, len(items), chunk_size)]
+
+        with ThreadPoolExecutor(max_workers=len(chunks)) as executor:
+            results = list(executor.map(_validate_nodes, chunks))
+
+        # Chunks are combined in order, so errors match validate_workflow's
+        has_node = any(chunk_has_node for chunk_has_node, _ in results)
+        errors = [error for _, chunk_errors in results for error in chunk_errors]
+        return WorkflowManager._finish_validation(has_node, errors)
+
+    @staticmethod
+    def fingerprint(data: bytes) -> bytes:
+        """
+        Compute a cache key for raw workflow bytes
+
+        Args:
+            data: Serialized workflow (e.g. the workflow file contents)
+
+        Returns:
+            Digest identifying the workflow content
+        """
+        return hashlib.sha1(data).digest()
+
+    @staticmethod
+    def validate_workflow_cached(workflow: Dict[str, Any],
+                                 fingerprint: bytes) -> tuple[bool, List[str]]:
+        """
+        Validate a workflow, reusing the result for a known fingerprint
+
+        Args:
+            workflow: Workflow dictionary to validate
+            fingerprint: Key identifying the workflow content, see fingerprint()
+
+        Returns:
+            Tuple of (is_valid, list of error messages)
+        """
+        cached = _get_cached_validation(fingerprint)
+        if cached is not None:
+            return cached
+
+        is_valid, errors = WorkflowManager.validate_workflow(workflow)
+        _store_validation(fingerprint, is_valid, errors)
+        return is_valid, errors
+
+    @staticmethod
+    def validate_workflow_bytes(data: bytes) -> tuple[bool, List[str]]:
+        """
+        Validate a serialized workflow
+
+        Shares the fingerprint cache with validate_workflow_cached, so
+        content that was validated before is not parsed again.
+
+        Args:
+            data: Workflow JSON bytes (e.g. the workflow file contents)
+
+        Returns:
+            Tuple of (is_valid, list of error messages)
+        """
+        fingerprint = WorkflowManager.fingerprint(data)
+        cached = _get_cached_validation(fingerprint)
+        if cached is not None:
+            return cached
+
+        try:
+            workflow = _json_loads(data)
+        except (json.JSONDecodeError, UnicodeDecodeError) as e:
+            is_valid, errors = False, [f"Invalid workflow JSON: {e}"]
+        else:
+            is_valid, errors = WorkflowManager.validate_workflow(workflow)
 
+        _store_validation(fingerprint, is_valid, errors)
         return is_valid, errors
 
-    def register_workflow(self, name: str, workflow: Dict[str, Any]):
+    def register_workflow(self, name: str, workflow: Dict[str, Any], copy: bool = True):
         """
         Register a workflow for later use
 
         Args:
             name: Workflow identifier
             workflow: Workflow dictionary
+            copy: Store a deep copy; pass False to store the dict itself when
+                  the caller will not modify it afterwards
         """
-        self.workflows[name] = copy.deepcopy(workflow)
-        logger.info(f"Registered workflow: {name}")
+        if copy:
+            workflow = _fast_clone(workflow)
+
+        type_index: Dict[str, List[str]] = {}
+        for node_id, node_data in workflow.items():
+            if isinstance(node_data, dict) and 'class_type' in node_data:
+                type_index.setdefault(node_data['class_type'], []).append(node_id)
 
-    def get_workflow(self, name: str) -> Dict[str, Any]:
+        self.workflows[name] = workflow
+        self._type_index[name] = type_index
+        logger.info("Registered workflow: %s", name)
+
+    def get_workflow(self, name: str, copy: bool = True) -> Dict[str, Any]:
         """
         Get a registered workflow
 
         Args:
             name: Workflow identifier
+            copy: Return a deep copy; with False the registered dict itself
+                  is returned, and mutating it changes the registry
 
         Returns:
-            Workflow dictionary (deep copy)
+            Workflow dictionary
         """
         if name not in self.workflows:
             raise KeyError(f"Workflow not found: {name}")
 
-        return copy.deepcopy(self.workflows[name])
+        workflow = self.workflows[name]
+        return _fast_clone(workflow) if copy else workflow
+
+    def find_registered_nodes_by_type(self, name: str, class_type: str) -> List[str]:
+        """
+        Find all nodes of a specific type in a registered workflow
+
+        Uses the index built by register_workflow instead of scanning nodes.
+
+        Args:
+            name: Workflow identifier
+            class_type: Node class type to search for
+
+        Returns:
+            List of node IDs
+        """
+        if name not in self._type_index:
+            raise KeyError(f"Workflow not found: {name}")
+
+        return list(self._type_index[name].get(class_type, ()))
 
     def list_workflows(self) -> List[str]:
         """List all registered workflows"""
@@ -157,36 +544,89 @@ class WorkflowManager:
         Returns:
             Updated workflow
         """
-        if node_id not in workflow:
+        try:
+            node = workflow[node_id]
+        except KeyError:
             raise KeyError(f"Node not found: {node_id}")
 
-        if 'inputs' not in workflow[node_id]:
-            workflow[node_id]['inputs'] = {}
+        node.setdefault('inputs', {})[input_name] = value
+        # Arguments are only formatted when DEBUG is enabled, which matters
+        # when this runs in tight patching loops
+        logger.debug("Updated %s.%s = %s", node_id, input_name, value)
+
+        return workflow
+
+    @staticmethod
+    def update_node_inputs(workflow: Dict[str, Any],
+                           updates: Dict[str, Dict[str, Any]]) -> Dict[str, Any]:
+        """
+        Update several node inputs in a workflow at once
+
+        Args:
+            workflow: Workflow dictionary
+            updates: Mapping of node_id to {input_name: value}
 
-        workflow[node_id]['inputs'][input_name] = value
-        logger.debug(f"Updated {node_id}.{input_name} = {value}")
+        Returns:
+            Updated workflow
+        """
+        for node_id, node_inputs in updates.items():
+            try:
+                node = workflow[node_id]
+            except KeyError:
+                raise KeyError(f"Node not found: {node_id}")
 
+            node.setdefault('inputs', {}).update(node_inputs)
+
+        logger.debug("Updated inputs on %s nodes", len(updates))
         return workflow
 
     @staticmethod
-    def find_nodes_by_type(workflow: Dict[str, Any],
+    def with_override(workflow: Dict[str, Any], node_id: str,
+                      input_name: str, value: Any) -> Dict[str, Any]:
+        """
+        Return a copy of a workflow with one node input changed
+
+        Only the updated node and its inputs are copied; every other node is
+        shared with the original, so the result must not be mutated in place.
+
+        Args:
+            workflow: Base workflow dictionary (left unchanged)
+            node_id: Node identifier
+            input_name: Input parameter name
+            value: New value
+
+        Returns:
+            New workflow dictionary
+        """
+        if node_id not in workflow:
+            raise KeyError(f"Node not found: {node_id}")
+
+        node = workflow[node_id]
+        return {
+            **workflow,
+            node_id: {**node, 'inputs': {**node.get('inputs', {}), input_name: value}}
+        }
+
+    @staticmethod
+    def find_nodes_by_type(workflow: Mapping[str, Any],
                           class_type: str) -> List[str]:
         """
         Find all nodes of a specific type
 
+        Only each node's class_type is read, so read-only mappings (such as
+        a shared, uncopied workflow) can be passed as-is.
+
         Args:
-            workflow: Workflow dictionary
+            workflow: Workflow mapping
             class_type: Node class type to search for
 
         Returns:
             List of node IDs
         """
-        nodes = []
-        for node_id, node_data in workflow.items():
-            if isinstance(node_data, dict) and node_data.get('class_type') == class_type:
-                nodes.append(node_id)
-
-        return nodes
+        return [
+            node_id for node_id, node_data in workflow.items()
+            if isinstance(node_data, dict) and node_data.get('class_type') == class_type
+        ]
 
     def create_template(self, name: str, workflow: Dict[str, Any],
                        parameters: Dict[str, Dict[str, str]]):
@@ -200,16 +640,51 @@ class WorkflowManager:
                        {node_id, input_name} mappings
         """
         self.templates[name] = {
-            'workflow': copy.deepcopy(workflow),
-            'parameters': parameters
+            'workflow': _fast_clone(workflow),
+            'parameters': parameters,
+            # Flattened once here so instantiation skips the per-call lookups
+            'param_list': [
+                (param_name, config['node_id'], config['input_name'])
+                for param_name, config in parameters.items()
+            ]
         }
-        logger.info(f"Created template: {name}")
+        logger.info("Created template: %s", name)
 
     def instantiate_template(self, name: str,
                            values: Dict[str, Any]) -> Dict[str, Any]:
         """
         Create a workflow from a template with specific values
 
+        Args:
+            name: Template identifier
+            values: Dictionary of parameter values
+
+        Returns:
+            Instantiated workflow, independent of the template
+        """
+        template = self._get_template(name)
+
+        workflow = _fast_clone(template['workflow'])
+        for node_id, node_inputs in self._template_updates(template, values).items():
+            try:
+                node = workflow[node_id]
+            except KeyError:
+                raise KeyError(f"Node not found: {node_id}")
+
+            node.setdefault('inputs', {}).update(node_inputs)
+
+        logger.info("Instantiated template: %s", name)
+        return workflow
+
+    def instantiate_template_shared(self, name: str,
+                                    values: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        Create a workflow from a template without copying untouched nodes
+
+        Only the nodes a parameter sets are copied; every other node is
+        shared with the template, so the result must not be mutated in place
+        (use with_override, or instantiate_template for an independent copy).
+
         Args:
             name: Template identifier
             values: Dictionary of parameter values
@@ -217,30 +692,47 @@ class WorkflowManager:
         Returns:
             Instantiated workflow
         """
-        if name not in self.templates:
-            raise KeyError(f"Template not found: {name}")
+        template = self._get_template(name)
 
-        template = self.templates[name]
-        workflow = copy.deepcopy(template['workflow'])
+        workflow = dict(template['workflow'])
+        for node_id, node_inputs in self._template_updates(template, values).items():
+            try:
+                node = workflow[node_id]
+            except KeyError:
+                raise KeyError(f"Node not found: {node_id}")
 
-        for param_name, param_config in template['parameters'].items():
-            if param_name in values:
-                node_id = param_config['node_id']
-                input_name = param_config['input_name']
-                workflow = self.update_node_input(
-                    workflow, node_id, input_name, values[param_name]
-                )
+            workflow[node_id] = {**node, 'inputs': {**node.get('inputs', {}), **node_inputs}}
 
-        logger.info(f"Instantiated template: {name}")
+        logger.info("Instantiated template: %s", name)
         return workflow
 
+    def _get_template(self, name: str) -> Dict[str, Any]:
+        """Look up a template, raising KeyError if it does not exist"""
+        if name not in self.templates:
+            raise KeyError(f"Template not found: {name}")
+        return self.templates[name]
+
+    @staticmethod
+    def _template_updates(template: Dict[str, Any],
+                          values: Dict[str, Any]) -> Dict[str, Dict[str, Any]]:
+        """Group the given parameter values by node, so each node is touched once"""
+        updates: Dict[str, Dict[str, Any]] = {}
+        for param_name, node_id, input_name in template['param_list']:
+            value = values.get(param_name, _MISSING)
+            if value is not _MISSING:
+                updates.setdefault(node_id, {})[input_name] = value
+        return updates
+
     @staticmethod
-    def get_workflow_info(workflow: Dict[str, Any]) -> Dict[str, Any]:
+    def get_workflow_info(workflow: Mapping[str, Any]) -> Dict[str, Any]:
         """
         Get information about a workflow
 
+        Only each node's class_type is read, so read-only mappings can be
+        passed without copying.
+
         Args:
-            workflow: Workflow dictionary
+            workflow: Workflow mapping
 
         Returns:
             Dictionary with workflow information
@@ -248,16 +740,19 @@ class WorkflowManager:
         node_types = {}
         total_nodes = 0
 
-        for node_id, node_data in workflow.items():
-            if isinstance(node_data, dict) and 'class_type' in node_data:
+        for node_data in workflow.values():
+            if not isinstance(node_data, dict):
+                continue
+
+            class_type = node_data.get('class_type', _MISSING)
+            if class_type is not _MISSING:
                 total_nodes += 1
-                class_type = node_data['class_type']
                 node_types[class_type] = node_types.get(class_type, 0) + 1
 
         return {
             'total_nodes': total_nodes,
             'node_types': node_types,
-            'node_ids': list(workflow.keys())
+            'node_ids': list(workflow)
         }
 
     @staticmethod
@@ -275,25 +770,23 @@ class WorkflowManager:
         Returns:
             Merged workflow
         """
-        merged = copy.deepcopy(workflow1)
+        merged = _fast_clone(workflow1)
 
-        for node_id, node_data in workflow2.items():
-            new_id = f"{node_id_prefix}{node_id}"
+        # New id for every workflow2 node, also used as the set of ids that
+        # input references may point at
+        new_ids = {node_id: f"{node_id_prefix}{node_id}" for node_id in workflow2}
 
-            # Update node references in inputs
-            updated_node = copy.deepcopy(node_data)
-            if 'inputs' in updated_node:
-                for input_name, input_value in updated_node['inputs'].items():
-                    if isinstance(input_value, list) and len(input_value) == 2:
-                        # This is a node reference [node_id, output_index]
-                        ref_node_id = input_value[0]
-                        if ref_node_id in workflow2:
-                            updated_node['inputs'][input_name] = [
-                                f"{node_id_prefix}{ref_node_id}",
-                                input_value[1]
-                            ]
+        # Clone workflow2 in one go, then rewrite references in place
+        for node_id, node_data in _fast_clone(workflow2).items():
+            inputs = node_data.get('inputs')
+            if inputs:
+                for input_name, input_value in inputs.items():
+                    # A node reference is [node_id, output_index]
+                    if (type(input_value) is list and len(input_value) == 2
+                            and input_value[0] in new_ids):
+                        input_value[0] = new_ids[input_value[0]]
 
-            merged[new_id] = updated_node
+            merged[new_ids[node_id]] = node_data
 
-        logger.info(f"Merged workflows: {len(workflow1)} + {len(workflow2)} nodes")
+        logger.info("Merged workflows: %s + %s nodes", len(workflow1), len(workflow2))
         return merged
@@ -42,22 +42,33 @@ class ComfyUIApp {
             this.showNotification('Disconnected', 'WebSocket connection lost', 'warning');
         });
 
-        this.socket.on('job_started', (data) => {
-            console.log('Job started:', data);
-            this.showNotification('Job Started', `Job ${data.job_id} started`, 'success');
+        // Job events arrive batched as arrays of payloads
+        this.socket.on('job_started', (jobs) => {
+            console.log('Jobs started:', jobs);
+            if (jobs.length === 1) {
+                this.showNotification('Job Started', `Job ${jobs[0].job_id} started`, 'success');
+            } else {
+                this.showNotification('Jobs Started', `${jobs.length} jobs started`, 'success');
+            }
             this.refreshQueue();
         });
 
-        this.socket.on('job_completed', (data) => {
-            console.log('Job completed:', data);
-            const duration = data.duration ? data.duration.toFixed(1) + 's' : 'N/A';
-            this.showNotification('Job Completed', `Job ${data.job_id} completed in ${duration}`, 'success');
+        this.socket.on('job_completed', (jobs) => {
+            console.log('Jobs completed:', jobs);
+            if (jobs.length === 1) {
+                const duration = jobs[0].duration ? jobs[0].duration.toFixed(1) + 's' : 'N/A';
+                this.showNotification('Job Completed', `Job ${jobs[0].job_id} completed in ${duration}`, 'success');
+            } else {
+                this.showNotification('Jobs Completed', `${jobs.length} jobs completed`, 'success');
+            }
             this.refreshQueue();
         });
 
-        this.socket.on('job_failed', (data) => {
-            console.log('Job failed:', data);
-            this.showNotification('Job Failed', `Job ${data.job_id}: ${data.error}`, 'error');
+        this.socket.on('job_failed', (jobs) => {
+            console.log('Jobs failed:', jobs);
+            jobs.forEach(data => {
+                this.showNotification('Job Failed', `Job ${data.job_id}: ${data.error}`, 'error');
+            });
             this.refreshQueue();
         });
 
@@ -620,7 +631,7 @@ class ComfyUIApp {
                             <div>Started: ${new Date(exec.started_at * 1000).toLocaleString()}</div>
                             ${exec.error ? `<div style="color: var(--danger-color)">Error: ${exec.error}</div>` : ''}
                         </div>
-                        ${exec.status === 'completed' && exec.history ? `
+                        ${exec.status === 'completed' && exec.images ? `
                             <div class="job-actions">
                                 <button class="btn btn-primary btn-sm view-results" data-execution-id="${exec.execution_id}">
                                     View Results
@@ -640,7 +651,7 @@ class ComfyUIApp {
                     this.showExecutionResults({
                         execution_id: exec.execution_id,
                         prompt_id: exec.prompt_id,
-                        images: this.extractImages(exec.history)
+                        images: exec.images
                     });
                 }
             });
@@ -699,7 +710,7 @@ class ComfyUIApp {
         formData.append('negative_prompt_node_id', negativePromptNodeId);
         formData.append('positive_prompt', positivePromptText);
         formData.append('negative_prompt', negativePromptText);
-        formData.append('workflow', JSON.stringify(this.selectedWorkflow.workflow));
+        formData.append('workflow', new Blob([JSON.stringify(this.selectedWorkflow.workflow)], {type: 'application/json'}), 'workflow.json');
         formData.append('workflow_name', this.selectedWorkflow.filename);
 
         try {
@@ -871,25 +882,6 @@ class ComfyUIApp {
         }
     }
 
-    extractImages(history) {
-        const images = [];
-        if (history && history.outputs) {
-            for (const [nodeId, output] of Object.entries(history.outputs)) {
-                if (output.images) {
-                    output.images.forEach(img => {
-                        images.push({
-                            node_id: nodeId,
-                            filename: img.filename,
-                            subfolder: img.subfolder || '',
-                            type: img.type || 'output'
-                        });
-                    });
-                }
-            }
-        }
-        return images;
-    }
-
     showNotification(title, message, type = 'info') {
         const container = document.getElementById('notifications');
         const notification = document.createElement('div');
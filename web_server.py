@@ -4,20 +4,33 @@ ComfyUI API Web Interface
 Flask-based web server for managing ComfyUI workflows
 """
 
+import os
 import sys
 import json
 import uuid
-import tempfile
 from pathlib import Path
 from datetime import datetime
-from threading import Thread, Lock
+from threading import Lock
 import time
+from collections import OrderedDict
+from itertools import islice
 
-from flask import Flask, render_template, request, jsonify, send_file, send_from_directory
+from flask import Flask, Response, render_template, request, jsonify, send_file, send_from_directory
+from flask.json.provider import DefaultJSONProvider
 from flask_cors import CORS
-from flask_socketio import SocketIO, emit
+from flask_socketio import SocketIO, emit, join_room
 from werkzeug.utils import secure_filename
 
+try:
+    import orjson
+except ImportError:  # orjson is optional, fall back to Flask's stdlib json
+    orjson = None
+
+try:
+    from whitenoise import WhiteNoise
+except ImportError:  # whitenoise is optional, Flask serves static files itself
+    WhiteNoise = None
+
 # Add src to path
 sys.path.insert(0, str(Path(__file__).parent / 'src'))
 
@@ -33,31 +46,317 @@ app = Flask(__name__,
 app.config['SECRET_KEY'] = 'comfyui-api-interface-secret'
 app.config['MAX_CONTENT_LENGTH'] = 50 * 1024 * 1024  # 50MB max file size
 
+
+class ORJSONProvider(DefaultJSONProvider):
+    """Flask JSON provider backed by orjson, for jsonify and request.json"""
+
+    def dumps(self, obj, **kwargs):
+        return orjson.dumps(obj, default=self.default,
+                            option=orjson.OPT_NON_STR_KEYS).decode('utf-8')
+
+    def loads(self, s, **kwargs):
+        return orjson.loads(s)
+
+
+if orjson is not None:
+    app.json = ORJSONProvider(app)
+
+_json_loads = orjson.loads if orjson is not None else json.loads
+
+
+def _json_dumps(obj):
+    """Serialize an object to UTF-8 JSON bytes"""
+    if orjson is not None:
+        return orjson.dumps(obj)
+    return json.dumps(obj).encode('utf-8')
+
+
+class _ORJSONSocketIOCodec:
+    """json module stand-in for Socket.IO packet encoding, backed by orjson"""
+
+    @staticmethod
+    def dumps(obj, **kwargs):
+        return orjson.dumps(obj).decode('utf-8')
+
+    @staticmethod
+    def loads(s, **kwargs):
+        return orjson.loads(s)
+
+
 CORS(app)
-socketio = SocketIO(app, cors_allowed_origins="*")
+if orjson is not None:
+    socketio = SocketIO(app, cors_allowed_origins="*", json=_ORJSONSocketIOCodec)
+else:
+    socketio = SocketIO(app, cors_allowed_origins="*")
+
+# Serve static assets through WhiteNoise ahead of Flask when installed; the
+# static route stays registered so url_for('static', ...) keeps working
+if WhiteNoise is not None:
+    app.wsgi_app = WhiteNoise(app.wsgi_app, root=app.static_folder, prefix='static/')
 
 # Global instances
 config = None
 comfyui_client = None
 workflow_mgr = None
 queue_mgr = None
-active_executions = {}
+active_executions = OrderedDict()
 execution_lock = Lock()
 
+# Finished executions beyond this many are evicted, oldest first
+MAX_EXECUTIONS = 1000
+
+# Queue events are buffered per event type and emitted to clients as a list
+# once per flush window, instead of one Socket.IO message per job change
+EVENT_BUFFER_MAX = 140
+_pending_events = {}
+_pending_lock = Lock()
+_event_flush_interval = 0.05
+_event_flusher_running = False
+
+# Prompts queued through the web API that ComfyUI has not finished yet,
+# mapped to their execution IDs. One monitor completes them all: from
+# ComfyUI WebSocket events when connected, otherwise by polling history.
+EXECUTION_POLL_INTERVAL = 1.0
+EXECUTION_SWEEP_INTERVAL = 10.0
+MAX_FINISHED_PROMPTS = 1000
+_prompt_executions = {}
+_finished_prompts = OrderedDict()
+_prompt_lock = Lock()
+
+# Broadcasts to more clients than this are sent in chunks, yielding to other
+# green threads between chunks
+BROADCAST_BATCH_SIZE = 50
+
+# Socket.IO rooms: every client joins the queue room on connect, and a
+# client joins an execution's room by subscribing to it
+QUEUE_ROOM = 'queue'
+
 # File upload settings
 UPLOAD_FOLDER = Path('workflows')
 UPLOAD_FOLDER.mkdir(exist_ok=True)
 ALLOWED_EXTENSIONS = {'json'}
+_ALLOWED_SUFFIXES = tuple(f'.{ext}' for ext in ALLOWED_EXTENSIONS)
+
+# Summary of each workflow file in UPLOAD_FOLDER, keyed by filename and
+# refreshed only when the file's mtime or size changes
+_workflow_index_cache = {}
+_workflow_index_lock = Lock()
 
 
 def allowed_file(filename):
     """Check if file extension is allowed"""
-    return '.' in filename and filename.rsplit('.', 1)[1].lower() in ALLOWED_EXTENSIONS
+    return filename.lower().endswith(_ALLOWED_SUFFIXES)
+
+
+def _trim_executions(max_entries=MAX_EXECUTIONS):
+    """Evict the oldest finished executions (call with execution_lock held)"""
+    excess = len(active_executions) - max_entries
+    if excess <= 0:
+        return
+
+    finished = (exec_id for exec_id, execution in active_executions.items()
+                 if execution['status'] in ('completed', 'failed'))
+    for exec_id in list(islice(finished, excess)):
+        del active_executions[exec_id]
+
+
+def _update_execution(execution_id, **changes):
+    """
+    Update a tracked execution
+
+    Entries are replaced rather than mutated, so readers can use a
+    reference taken under execution_lock after releasing it. Setting
+    completed_at also stores the final duration.
+
+    Args:
+        execution_id: Execution to update (ignored if no longer tracked)
+        **changes: Fields to set
+    """
+    with execution_lock:
+        execution = active_executions.get(execution_id)
+        if execution is not None:
+            if 'completed_at' in changes and 'started_at' in execution:
+                changes['duration'] = changes['completed_at'] - execution['started_at']
+            active_executions[execution_id] = {**execution, **changes}
+
+
+def _execution_response(execution_id, execution):
+    """Build the API view of an execution, adding a running duration"""
+    response = {**execution, 'execution_id': execution_id}
+
+    # Finished executions store their duration
+    if 'duration' not in response and 'started_at' in response:
+        response['duration'] = time.time() - response['started_at']
+
+    return response
+
+
+def _track_execution(execution_id, prompt_id):
+    """Register a queued prompt with the shared execution monitor"""
+    with _prompt_lock:
+        _prompt_executions[prompt_id] = execution_id
+        # The completion event may have arrived before we registered
+        finished = _finished_prompts.pop(prompt_id, None) is not None
+
+    if finished:
+        socketio.start_background_task(_check_prompt, prompt_id)
+
+
+def _check_prompt(prompt_id):
+    """Complete the execution for a prompt if ComfyUI has its history"""
+    try:
+        history = comfyui_client.get_history(prompt_id)
+    except Exception as e:
+        print(f"Error fetching history for {prompt_id}: {e}")
+        return
+
+    if prompt_id not in history:
+        return
+
+    with _prompt_lock:
+        execution_id = _prompt_executions.pop(prompt_id, None)
+
+    # Another check may have completed it already
+    if execution_id is not None:
+        _finish_execution(execution_id, prompt_id, history[prompt_id])
+
+
+def _finish_execution(execution_id, prompt_id, history):
+    """Record a finished execution and notify clients"""
+    try:
+        # Keep only the output images, not the full history
+        images = extract_output_images(history)
+
+        _update_execution(execution_id, status='completed', images=images,
+                          completed_at=time.time())
+
+        broadcast_to_clients('execution_completed', {
+            'execution_id': execution_id,
+            'prompt_id': prompt_id,
+            'images': images
+        }, room=_execution_room(execution_id))
+
+    except Exception as e:
+        _update_execution(execution_id, status='failed', error=str(e),
+                          completed_at=time.time())
+
+        broadcast_to_clients('execution_failed', {
+            'execution_id': execution_id,
+            'error': str(e)
+        }, room=_execution_room(execution_id))
+
+
+def _on_comfyui_executing(data):
+    """ComfyUI WebSocket callback; executing with node=None ends a prompt"""
+    payload = data.get('data') or {}
+    prompt_id = payload.get('prompt_id')
+    if payload.get('node') is not None or not prompt_id:
+        return
+
+    with _prompt_lock:
+        tracked = prompt_id in _prompt_executions
+        if not tracked:
+            _finished_prompts[prompt_id] = True
+            if len(_finished_prompts) > MAX_FINISHED_PROMPTS:
+                _finished_prompts.popitem(last=False)
+
+    if tracked:
+        socketio.start_background_task(_check_prompt, prompt_id)
+
+
+def _execution_monitor():
+    """
+    Background task polling history for tracked prompts
+
+    Polls every EXECUTION_POLL_INTERVAL while the ComfyUI WebSocket is down.
+    While it is up, events complete prompts; history is checked once after
+    each (re)connect for prompts that finished while it was down, and every
+    EXECUTION_SWEEP_INTERVAL for prompts whose completion check failed.
+    """
+    swept_ws = None
+    last_sweep = 0.0
+    while True:
+        socketio.sleep(EXECUTION_POLL_INTERVAL)
+
+        # The client opens a new WebSocketApp on every reconnect
+        ws = comfyui_client.ws
+        now = time.monotonic()
+        if (comfyui_client.ws_running and ws is swept_ws
+                and now - last_sweep < EXECUTION_SWEEP_INTERVAL):
+            continue
+        swept_ws = ws
+        last_sweep = now
+
+        with _prompt_lock:
+            prompt_ids = list(_prompt_executions)
+
+        for prompt_id in prompt_ids:
+            _check_prompt(prompt_id)
+
+
+def _execution_room(execution_id):
+    """Socket.IO room for updates about one execution"""
+    return f"exec:{execution_id}"
+
+
+def broadcast_to_clients(event, payload, room=None):
+    """
+    Emit an event to every client in a room
+
+    Args:
+        event: Socket.IO event name
+        payload: Event data
+        room: Room to emit to (None for all connected clients)
+    """
+    sids = [sid for sid, _ in socketio.server.manager.get_participants('/', room)]
+
+    if not sids:
+        return
+
+    if len(sids) <= BROADCAST_BATCH_SIZE:
+        socketio.emit(event, payload, to=room)
+        return
+
+    for i in range(0, len(sids), BROADCAST_BATCH_SIZE):
+        socketio.emit(event, payload, to=sids[i:i + BROADCAST_BATCH_SIZE])
+        socketio.sleep(0)
+
+
+def _queue_event(event, payload):
+    """Buffer a Socket.IO event, flushing its buffer early once it is full"""
+    with _pending_lock:
+        buffer = _pending_events.setdefault(event, [])
+        buffer.append(payload)
+        if len(buffer) < EVENT_BUFFER_MAX:
+            return
+        del _pending_events[event]
+
+    broadcast_to_clients(event, buffer, room=QUEUE_ROOM)
+
+
+def _flush_events():
+    """Emit all buffered Socket.IO events, one message per event type"""
+    with _pending_lock:
+        if not _pending_events:
+            return
+        pending = _pending_events.copy()
+        _pending_events.clear()
+
+    for event, payloads in pending.items():
+        broadcast_to_clients(event, payloads, room=QUEUE_ROOM)
+
+
+def _event_flusher():
+    """Background task that flushes buffered events every flush interval"""
+    while _event_flusher_running:
+        socketio.sleep(_event_flush_interval)
+        _flush_events()
 
 
 def init_app():
     """Initialize application components"""
     global config, comfyui_client, workflow_mgr, queue_mgr
+    global _event_flush_interval, _event_flusher_running
 
     # Load config
     config_path = Path('config.yaml')
@@ -72,6 +371,15 @@ def init_app():
         timeout=comfyui_config['timeout']
     )
 
+    # Follow ComfyUI over WebSocket so executions complete from events
+    comfyui_client.on('executing', _on_comfyui_executing)
+    if config.get('websocket', {}).get('enable', True):
+        try:
+            comfyui_client.connect_websocket()
+        except Exception as e:
+            print(f"ComfyUI WebSocket unavailable, polling for results: {e}")
+    socketio.start_background_task(_execution_monitor)
+
     # Initialize workflow manager
     workflow_mgr = WorkflowManager()
 
@@ -86,14 +394,14 @@ def init_app():
 
     # Setup queue callbacks
     def on_job_started(job):
-        socketio.emit('job_started', {
+        _queue_event('job_started', {
             'job_id': job.job_id,
             'status': 'running',
             'started_at': job.started_at
         })
 
     def on_job_completed(job):
-        socketio.emit('job_completed', {
+        _queue_event('job_completed', {
             'job_id': job.job_id,
             'status': 'completed',
             'completed_at': job.completed_at,
@@ -101,7 +409,7 @@ def init_app():
         })
 
     def on_job_failed(job):
-        socketio.emit('job_failed', {
+        _queue_event('job_failed', {
             'job_id': job.job_id,
             'status': 'failed',
             'error': job.error
@@ -111,6 +419,11 @@ def init_app():
     queue_mgr.on('job_completed', on_job_completed)
     queue_mgr.on('job_failed', on_job_failed)
 
+    # Start flushing buffered queue events
+    _event_flush_interval = batch_config.get('ws_flush_ms', 50) / 1000.0
+    _event_flusher_running = True
+    socketio.start_background_task(_event_flusher)
+
     # Start queue manager
     queue_mgr.start()
 
@@ -156,31 +469,57 @@ def api_status():
 def list_workflows():
     """List available workflows"""
     workflows = []
-    for wf_path in UPLOAD_FOLDER.glob('*.json'):
-        try:
-            workflow = workflow_mgr.load_workflow(wf_path)
-            info = workflow_mgr.get_workflow_info(workflow)
-            workflows.append({
-                'filename': wf_path.name,
-                'name': wf_path.stem,
-                'size': wf_path.stat().st_size,
-                'modified': wf_path.stat().st_mtime,
-                'node_count': info['total_nodes']
-            })
-        except Exception as e:
-            print(f"Error loading {wf_path}: {e}")
+    seen = set()
+
+    with os.scandir(UPLOAD_FOLDER) as entries:
+        for entry in entries:
+            if not entry.name.endswith('.json') or not entry.is_file():
+                continue
+
+            try:
+                st = entry.stat()
+                seen.add(entry.name)
+
+                with _workflow_index_lock:
+                    cached = _workflow_index_cache.get(entry.name)
+
+                if (cached is None or cached['modified'] != st.st_mtime
+                        or cached['size'] != st.st_size):
+                    workflow = workflow_mgr.load_workflow(Path(entry.path))
+                    info = workflow_mgr.get_workflow_info(workflow)
+                    cached = {
+                        'filename': entry.name,
+                        'name': entry.name[:-len('.json')],
+                        'size': st.st_size,
+                        'modified': st.st_mtime,
+                        'node_count': info['total_nodes']
+                    }
+                    with _workflow_index_lock:
+                        _workflow_index_cache[entry.name] = cached
+
+                workflows.append(dict(cached))
+            except Exception as e:
+                print(f"Error loading {entry.path}: {e}")
+
+    # Drop entries for files removed outside the API
+    with _workflow_index_lock:
+        for name in _workflow_index_cache.keys() - seen:
+            del _workflow_index_cache[name]
 
     return jsonify(workflows)
 
 
+def _invalidate_workflow_index(filename):
+    """Forget the cached summary of a workflow file"""
+    with _workflow_index_lock:
+        _workflow_index_cache.pop(filename, None)
+
+
 @app.route('/api/workflows/<filename>', methods=['GET'])
 def get_workflow(filename):
     """Get workflow details"""
     wf_path = UPLOAD_FOLDER / secure_filename(filename)
 
-    if not wf_path.exists():
-        return jsonify({'error': 'Workflow not found'}), 404
-
     try:
         workflow = workflow_mgr.load_workflow(wf_path)
         info = workflow_mgr.get_workflow_info(workflow)
@@ -195,6 +534,8 @@ def get_workflow(filename):
                 'errors': errors
             }
         })
+    except FileNotFoundError:
+        return jsonify({'error': 'Workflow not found'}), 404
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
@@ -217,13 +558,21 @@ def upload_workflow():
         filename = secure_filename(file.filename)
         filepath = UPLOAD_FOLDER / filename
 
-        # Save file
-        file.save(str(filepath))
+        # Read the upload once: parse it from memory, then write the same
+        # bytes to disk instead of saving and reading the file back
+        data = file.read()
+        try:
+            workflow = _json_loads(data)
+        except ValueError as e:
+            return jsonify({'error': f'Invalid workflow JSON: {e}'}), 400
 
-        # Validate workflow
-        workflow = workflow_mgr.load_workflow(filepath)
         is_valid, errors = workflow_mgr.validate_workflow(workflow)
 
+        # Replaced atomically, so concurrent readers (and the workflow
+        # index) never see a half-written file
+        workflow_mgr.save_workflow_bytes(data, filepath)
+        _invalidate_workflow_index(filename)
+
         if not is_valid:
             return jsonify({
                 'warning': 'Workflow uploaded but validation failed',
@@ -246,12 +595,12 @@ def delete_workflow(filename):
     """Delete a workflow"""
     wf_path = UPLOAD_FOLDER / secure_filename(filename)
 
-    if not wf_path.exists():
-        return jsonify({'error': 'Workflow not found'}), 404
-
     try:
         wf_path.unlink()
+        _invalidate_workflow_index(wf_path.name)
         return jsonify({'success': True, 'message': 'Workflow deleted'})
+    except FileNotFoundError:
+        return jsonify({'error': 'Workflow not found'}), 404
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
@@ -269,17 +618,19 @@ def execute_workflow():
 
         # Apply parameter updates if provided
         if 'parameters' in data:
+            # Group by node so each node is looked up once
+            updates = {}
             for param in data['parameters']:
-                workflow_mgr.update_node_input(
-                    workflow,
-                    param['node_id'],
-                    param['input_name'],
-                    param['value']
-                )
+                updates.setdefault(param['node_id'], {})[param['input_name']] = param['value']
+            workflow_mgr.update_node_inputs(workflow, updates)
+
+        # Serialize once: the bytes key the validation cache and are sent as is
+        workflow_json = _json_dumps(workflow)
 
         # Validate if enabled
         if config['workflow'].get('validate_before_send', True):
-            is_valid, errors = workflow_mgr.validate_workflow(workflow)
+            is_valid, errors = workflow_mgr.validate_workflow_cached(
+                workflow, workflow_mgr.fingerprint(workflow_json))
             if not is_valid:
                 return jsonify({
                     'error': 'Workflow validation failed',
@@ -287,7 +638,7 @@ def execute_workflow():
                 }), 400
 
         # Send to ComfyUI
-        response = comfyui_client.queue_prompt(workflow)
+        response = comfyui_client.queue_prompt(workflow_json)
         prompt_id = response.get('prompt_id')
 
         if not prompt_id:
@@ -302,39 +653,10 @@ def execute_workflow():
                 'started_at': time.time(),
                 'workflow_name': data.get('workflow_name', 'Unknown')
             }
+            _trim_executions()
 
-        # Start monitoring in background
-        def monitor_execution():
-            try:
-                history = comfyui_client.wait_for_completion(prompt_id)
-
-                with execution_lock:
-                    if execution_id in active_executions:
-                        active_executions[execution_id]['status'] = 'completed'
-                        active_executions[execution_id]['history'] = history
-                        active_executions[execution_id]['completed_at'] = time.time()
-
-                # Extract images
-                images = extract_output_images(history)
-
-                socketio.emit('execution_completed', {
-                    'execution_id': execution_id,
-                    'prompt_id': prompt_id,
-                    'images': images
-                })
-
-            except Exception as e:
-                with execution_lock:
-                    if execution_id in active_executions:
-                        active_executions[execution_id]['status'] = 'failed'
-                        active_executions[execution_id]['error'] = str(e)
-
-                socketio.emit('execution_failed', {
-                    'execution_id': execution_id,
-                    'error': str(e)
-                })
-
-        Thread(target=monitor_execution, daemon=True).start()
+        # Hand the prompt to the shared execution monitor
+        _track_execution(execution_id, prompt_id)
 
         return jsonify({
             'success': True,
@@ -361,11 +683,11 @@ def execute_batch():
         for filename in data['filenames']:
             wf_path = UPLOAD_FOLDER / secure_filename(filename)
 
-            if not wf_path.exists():
+            try:
+                workflow = workflow_mgr.load_workflow(wf_path)
+            except FileNotFoundError:
                 continue
 
-            workflow = workflow_mgr.load_workflow(wf_path)
-
             job_id = f"{wf_path.stem}_{int(time.time())}"
             queue_mgr.add_job(job_id, workflow, metadata={'filename': filename})
             job_ids.append(job_id)
@@ -385,40 +707,22 @@ def execute_batch():
 def get_execution(execution_id):
     """Get execution status"""
     with execution_lock:
-        if execution_id not in active_executions:
-            return jsonify({'error': 'Execution not found'}), 404
-
-        execution = active_executions[execution_id].copy()
+        execution = active_executions.get(execution_id)
 
-    # Calculate duration
-    if 'started_at' in execution:
-        if 'completed_at' in execution:
-            execution['duration'] = execution['completed_at'] - execution['started_at']
-        else:
-            execution['duration'] = time.time() - execution['started_at']
+    if execution is None:
+        return jsonify({'error': 'Execution not found'}), 404
 
-    return jsonify(execution)
+    return jsonify(_execution_response(execution_id, execution))
 
 
 @app.route('/api/executions')
 def list_executions():
     """List all executions"""
     with execution_lock:
-        executions = []
-        for exec_id, exec_data in active_executions.items():
-            exec_copy = exec_data.copy()
-            exec_copy['execution_id'] = exec_id
+        snapshot = list(active_executions.items())
 
-            # Calculate duration
-            if 'started_at' in exec_copy:
-                if 'completed_at' in exec_copy:
-                    exec_copy['duration'] = exec_copy['completed_at'] - exec_copy['started_at']
-                else:
-                    exec_copy['duration'] = time.time() - exec_copy['started_at']
-
-            executions.append(exec_copy)
-
-    return jsonify(executions)
+    return jsonify([_execution_response(exec_id, execution)
+                    for exec_id, execution in snapshot])
 
 
 @app.route('/api/queue')
@@ -473,6 +777,56 @@ def cancel_job(job_id):
         return jsonify({'error': str(e)}), 500
 
 
+# Input names tried, in order of preference, when placing an uploaded
+# image or prompt text into a node
+IMAGE_PARAM_NAMES = ('image', 'images', 'input_image', 'input', 'source_image', 'img')
+TEXT_PARAM_NAMES = ('text', 'prompt', 'string', 'description', 'caption', 'positive')
+
+
+def _is_image_input_name(name):
+    """Check whether an input name looks like it takes an image"""
+    name = name.lower()
+    return name.startswith('image') or name.endswith('image') or 'img' in name
+
+
+def _set_prompt_text(workflow, node_id, text, label):
+    """
+    Write prompt text into a node's best matching input
+
+    Args:
+        workflow: Workflow dictionary (modified in place)
+        node_id: ID of the prompt node
+        text: Prompt text
+        label: Node description for log output (positive/negative)
+
+    Returns:
+        True if an existing input was used, False if 'text' was added
+    """
+    node = workflow[node_id]
+    inputs = node.setdefault('inputs', {})
+
+    # Log current node structure for debugging
+    print(f"{label.capitalize()} node {node_id} structure: {node}")
+    print(f"{label.capitalize()} node inputs: {inputs}")
+
+    key = next((name for name in TEXT_PARAM_NAMES if name in inputs), None)
+    if key is not None:
+        print(f"Found matching param '{key}' in {label} node")
+    else:
+        # If not found, try any string parameter
+        key = next((k for k, value in inputs.items() if isinstance(value, str)), None)
+        if key is not None:
+            print(f"Using string param '{key}' in {label} node")
+
+    # If still not found, add as new parameter
+    if key is None:
+        print(f"Creating new 'text' param in {label} node")
+
+    inputs[key or 'text'] = text
+    print(f"After update - {label.capitalize()} node inputs: {inputs}")
+    return key is not None
+
+
 @app.route('/api/send_to_nodes', methods=['POST'])
 def send_to_nodes():
     """Send image to one node and prompts to two separate nodes"""
@@ -487,7 +841,13 @@ def send_to_nodes():
         negative_prompt_node_id = request.form.get('negative_prompt_node_id')
         positive_prompt_text = request.form.get('positive_prompt')
         negative_prompt_text = request.form.get('negative_prompt')
-        workflow_json = request.form.get('workflow')
+        # The workflow is sent as a JSON file part (raw bytes); a plain form
+        # field is still accepted from older clients
+        workflow_file = request.files.get('workflow')
+        if workflow_file is not None:
+            workflow_json = workflow_file.read()
+        else:
+            workflow_json = request.form.get('workflow')
         workflow_name = request.form.get('workflow_name', 'Unknown')
 
         # Debug logging
@@ -519,7 +879,7 @@ def send_to_nodes():
             return jsonify({'error': 'No workflow provided'}), 400
 
         # Parse workflow
-        workflow = json.loads(workflow_json)
+        workflow = _json_loads(workflow_json)
 
         # Check if all nodes exist
         if image_node_id not in workflow:
@@ -531,130 +891,44 @@ def send_to_nodes():
         if negative_prompt_node_id not in workflow:
             return jsonify({'error': f'Negative prompt node {negative_prompt_node_id} not found in workflow'}), 400
 
-        # Upload image to ComfyUI
-        # Save uploaded file temporarily
+        # Upload image to ComfyUI straight from the request stream,
+        # without writing it to a temporary file first
         image_filename = secure_filename(image_file.filename)
-        temp_dir = Path(tempfile.gettempdir())
-        temp_image_path = temp_dir / image_filename
-
-        try:
-            image_file.save(str(temp_image_path))
+        image_result = comfyui_client.upload_image_stream(
+            image_file.stream, image_filename, subfolder='', overwrite=True)
 
-            # Upload to ComfyUI
-            image_result = comfyui_client.upload_image(temp_image_path, subfolder='', overwrite=True)
+        if not image_result or 'name' not in image_result:
+            return jsonify({'error': 'Failed to upload image to ComfyUI'}), 500
 
-            if not image_result or 'name' not in image_result:
-                return jsonify({'error': 'Failed to upload image to ComfyUI'}), 500
-
-            uploaded_image_name = image_result['name']
-        finally:
-            # Clean up temp file
-            if temp_image_path.exists():
-                temp_image_path.unlink()
+        uploaded_image_name = image_result['name']
 
         # Update the image node
-        image_node = workflow[image_node_id]
-        image_param_names = ['image', 'images', 'input_image', 'input', 'source_image', 'img']
-        image_param_found = False
-
-        for param_name in image_param_names:
-            if param_name in image_node.get('inputs', {}):
-                image_node['inputs'][param_name] = uploaded_image_name
-                image_param_found = True
-                break
+        image_inputs = workflow[image_node_id].setdefault('inputs', {})
+        image_key = next((name for name in IMAGE_PARAM_NAMES if name in image_inputs), None)
 
         # If no common image parameter found, try pattern matching
-        if not image_param_found:
-            for key, value in image_node.get('inputs', {}).items():
-                if isinstance(value, str) and (
-                    key.lower().endswith('image') or
-                    key.lower().startswith('image') or
-                    'img' in key.lower()
-                ):
-                    image_node['inputs'][key] = uploaded_image_name
-                    image_param_found = True
-                    break
-
-        # If still not found, add as new parameter
-        if not image_param_found:
-            image_node['inputs']['image'] = uploaded_image_name
-
-        # Update the positive prompt node
-        positive_node = workflow[positive_prompt_node_id]
-
-        # Ensure inputs dict exists
-        if 'inputs' not in positive_node:
-            positive_node['inputs'] = {}
+        if image_key is None:
+            image_key = next((key for key, value in image_inputs.items()
+                              if isinstance(value, str) and _is_image_input_name(key)), None)
 
-        text_param_names = ['text', 'prompt', 'string', 'description', 'caption', 'positive']
-        positive_param_found = False
-
-        # Log current node structure for debugging
-        print(f"Positive node {positive_prompt_node_id} structure: {positive_node}")
-        print(f"Positive node inputs: {positive_node.get('inputs', {})}")
-
-        for param_name in text_param_names:
-            if param_name in positive_node['inputs']:
-                print(f"Found matching param '{param_name}' in positive node")
-                positive_node['inputs'][param_name] = positive_prompt_text
-                positive_param_found = True
-                break
-
-        # If not found, try any string parameter
-        if not positive_param_found:
-            for key, value in positive_node['inputs'].items():
-                if isinstance(value, str):
-                    print(f"Using string param '{key}' in positive node")
-                    positive_node['inputs'][key] = positive_prompt_text
-                    positive_param_found = True
-                    break
+        image_param_found = image_key is not None
 
         # If still not found, add as new parameter
-        if not positive_param_found:
-            print(f"Creating new 'text' param in positive node")
-            positive_node['inputs']['text'] = positive_prompt_text
-
-        print(f"After update - Positive node inputs: {positive_node['inputs']}")
-
-        # Update the negative prompt node
-        negative_node = workflow[negative_prompt_node_id]
+        image_inputs[image_key or 'image'] = uploaded_image_name
 
-        # Ensure inputs dict exists
-        if 'inputs' not in negative_node:
-            negative_node['inputs'] = {}
+        # Update the prompt nodes
+        positive_param_found = _set_prompt_text(
+            workflow, positive_prompt_node_id, positive_prompt_text, 'positive')
+        negative_param_found = _set_prompt_text(
+            workflow, negative_prompt_node_id, negative_prompt_text, 'negative')
 
-        negative_param_found = False
-
-        # Log current node structure for debugging
-        print(f"Negative node {negative_prompt_node_id} structure: {negative_node}")
-        print(f"Negative node inputs: {negative_node.get('inputs', {})}")
-
-        for param_name in text_param_names:
-            if param_name in negative_node['inputs']:
-                print(f"Found matching param '{param_name}' in negative node")
-                negative_node['inputs'][param_name] = negative_prompt_text
-                negative_param_found = True
-                break
-
-        # If not found, try any string parameter
-        if not negative_param_found:
-            for key, value in negative_node['inputs'].items():
-                if isinstance(value, str):
-                    print(f"Using string param '{key}' in negative node")
-                    negative_node['inputs'][key] = negative_prompt_text
-                    negative_param_found = True
-                    break
-
-        # If still not found, add as new parameter
-        if not negative_param_found:
-            print(f"Creating new 'text' param in negative node")
-            negative_node['inputs']['text'] = negative_prompt_text
-
-        print(f"After update - Negative node inputs: {negative_node['inputs']}")
+        # Serialize once: the bytes key the validation cache and are sent as is
+        workflow_json = _json_dumps(workflow)
 
         # Validate workflow if enabled
         if config['workflow'].get('validate_before_send', True):
-            is_valid, errors = workflow_mgr.validate_workflow(workflow)
+            is_valid, errors = workflow_mgr.validate_workflow_cached(
+                workflow, workflow_mgr.fingerprint(workflow_json))
             if not is_valid:
                 return jsonify({
                     'error': 'Workflow validation failed after updating nodes',
@@ -669,7 +943,7 @@ def send_to_nodes():
         print(f"============================\n")
 
         # Execute workflow
-        response = comfyui_client.queue_prompt(workflow)
+        response = comfyui_client.queue_prompt(workflow_json)
         prompt_id = response.get('prompt_id')
 
         if not prompt_id:
@@ -688,39 +962,10 @@ def send_to_nodes():
                 'negative_prompt_node_id': negative_prompt_node_id,
                 'uploaded_image': uploaded_image_name
             }
+            _trim_executions()
 
-        # Start monitoring in background
-        def monitor_execution():
-            try:
-                history = comfyui_client.wait_for_completion(prompt_id)
-
-                with execution_lock:
-                    if execution_id in active_executions:
-                        active_executions[execution_id]['status'] = 'completed'
-                        active_executions[execution_id]['history'] = history
-                        active_executions[execution_id]['completed_at'] = time.time()
-
-                # Extract images
-                images = extract_output_images(history)
-
-                socketio.emit('execution_completed', {
-                    'execution_id': execution_id,
-                    'prompt_id': prompt_id,
-                    'images': images
-                })
-
-            except Exception as e:
-                with execution_lock:
-                    if execution_id in active_executions:
-                        active_executions[execution_id]['status'] = 'failed'
-                        active_executions[execution_id]['error'] = str(e)
-
-                socketio.emit('execution_failed', {
-                    'execution_id': execution_id,
-                    'error': str(e)
-                })
-
-        Thread(target=monitor_execution, daemon=True).start()
+        # Hand the prompt to the shared execution monitor
+        _track_execution(execution_id, prompt_id)
 
         return jsonify({
             'success': True,
@@ -757,7 +1002,8 @@ def get_image(filename):
         subfolder = request.args.get('subfolder', '')
         folder_type = request.args.get('type', 'output')
 
-        image_data = comfyui_client.get_image(filename, subfolder, folder_type)
+        # Stream the image through rather than buffering it in memory
+        image_stream = comfyui_client.iter_image(filename, subfolder, folder_type)
 
         # Determine content type
         content_type = 'image/png'
@@ -766,8 +1012,7 @@ def get_image(filename):
         elif filename.lower().endswith('.webp'):
             content_type = 'image/webp'
 
-        from flask import Response
-        return Response(image_data, mimetype=content_type)
+        return Response(image_stream, mimetype=content_type, direct_passthrough=True)
 
     except Exception as e:
         return jsonify({'error': str(e)}), 500
@@ -779,6 +1024,7 @@ def get_image(filename):
 def handle_connect():
     """Handle client connection"""
     print(f"Client connected: {request.sid}")
+    join_room(QUEUE_ROOM)
     emit('connected', {'message': 'Connected to ComfyUI API server'})
 
 
@@ -793,6 +1039,26 @@ def handle_subscribe(data):
     """Subscribe to execution updates"""
     execution_id = data.get('execution_id')
     print(f"Client subscribed to execution: {execution_id}")
+    join_room(_execution_room(execution_id))
+
+    # The execution may have finished before the client subscribed
+    with execution_lock:
+        execution = active_executions.get(execution_id)
+
+    if execution is None:
+        return
+
+    if execution['status'] == 'completed':
+        emit('execution_completed', {
+            'execution_id': execution_id,
+            'prompt_id': execution['prompt_id'],
+            'images': execution.get('images', [])
+        })
+    elif execution['status'] == 'failed':
+        emit('execution_failed', {
+            'execution_id': execution_id,
+            'error': execution.get('error')
+        })
 
 
 # Error handlers
@@ -807,29 +1073,90 @@ def internal_error(e):
     return jsonify({'error': 'Internal server error'}), 500
 
 
+def run_production_server(host, port, threads):
+    """
+    Serve the app with gunicorn's threaded worker
+
+    A single worker process is used: executions, the job queue and
+    Socket.IO sessions all live in this process's memory. The app is
+    initialized inside the worker, since threads started before gunicorn
+    forks would not survive into it.
+
+    Args:
+        host: Host to bind to
+        port: Port to bind to
+        threads: Request handling threads
+    """
+    from gunicorn.app.base import BaseApplication
+
+    def on_worker_exit(server, worker):
+        global _event_flusher_running
+        _event_flusher_running = False
+        _flush_events()
+
+    class ProductionServer(BaseApplication):
+        def load_config(self):
+            self.cfg.set('bind', f'{host}:{port}')
+            self.cfg.set('workers', 1)
+            self.cfg.set('worker_class', 'gthread')
+            self.cfg.set('threads', threads)
+            self.cfg.set('worker_exit', on_worker_exit)
+
+        def load(self):
+            init_app()
+            print_banner(host, port)
+            return app
+
+    ProductionServer().run()
+
+
+def print_banner(host, port):
+    """Print the server and ComfyUI addresses"""
+    print("\n" + "=" * 60)
+    print("ComfyUI API Web Interface")
+    print("=" * 60)
+    print(f"Server: http://{host}:{port}")
+    print(f"ComfyUI: {config['comfyui']['protocol']}://{config['comfyui']['host']}:{config['comfyui']['port']}")
+    print("=" * 60 + "\n")
+
+
 def main():
     """Main entry point"""
+    global _event_flusher_running
     import argparse
 
     parser = argparse.ArgumentParser(description='ComfyUI API Web Interface')
     parser.add_argument('--host', default='0.0.0.0', help='Host to bind to')
     parser.add_argument('--port', type=int, default=5000, help='Port to bind to')
     parser.add_argument('--debug', action='store_true', help='Enable debug mode')
+    parser.add_argument('--production', action='store_true',
+                        help='Serve with gunicorn instead of the development server')
+    parser.add_argument('--threads', type=int, default=100,
+                        help='Request threads for --production')
 
     args = parser.parse_args()
 
+    if args.production:
+        try:
+            import gunicorn  # noqa: F401
+        except ImportError:
+            print("Error: --production requires gunicorn (pip install gunicorn)")
+            sys.exit(1)
+
+        # Initialized in the worker process
+        run_production_server(args.host, args.port, args.threads)
+        return
+
     # Initialize app
     init_app()
-
-    print("\n" + "=" * 60)
-    print("ComfyUI API Web Interface")
-    print("=" * 60)
-    print(f"Server: http://{args.host}:{args.port}")
-    print(f"ComfyUI: {config['comfyui']['protocol']}://{config['comfyui']['host']}:{config['comfyui']['port']}")
-    print("=" * 60 + "\n")
+    print_banner(args.host, args.port)
 
     # Run server
-    socketio.run(app, host=args.host, port=args.port, debug=args.debug)
+    try:
+        socketio.run(app, host=args.host, port=args.port, debug=args.debug)
+    finally:
+        _event_flusher_running = False
+        _flush_events()
 
 
 if __name__ == '__main__':